@@ -2,6 +2,7 @@
 
 import json
 import logging
+import re
 import uuid
 from datetime import datetime, timezone
 from typing import Optional
@@ -10,6 +11,13 @@ import redis
 
 logger = logging.getLogger("c3po.messaging")
 
+# Keywords that make a message "urgent". Classified once when the message is
+# stored so hooks can read the flag instead of scanning every message body on
+# every poll. hooks/c3po_common.py keeps a copy only as a fallback for
+# messages from older coordinators; tests/test_urgent_sync.py checks the two
+# agree.
+URGENT_RE = re.compile(r"urgent|interrupt|cancel|asap|emergency|critical", re.IGNORECASE)
+
 
 class MessageManager:
     """Manages message queues using Redis."""
@@ -171,6 +179,7 @@ return kept
             "context": context,
             "timestamp": now,
             "status": "pending",
+            "urgent": URGENT_RE.search(message) is not None,
         }
 
         # Push to target agent's inbox (RPUSH for FIFO order)
@@ -364,6 +373,7 @@ return kept
             "context": "",  # Empty context
             "status": status,  # Status field
             "timestamp": datetime.now(timezone.utc).isoformat(),
+            "urgent": URGENT_RE.search(response) is not None,
         }
 
         # Push to original sender's single messages queue
@@ -606,6 +616,12 @@ return kept
             logger.info("wait_for_message immediate agent=%s count=%d", agent_id, len(existing))
             return existing
 
+        # A waiter that arrives after shutdown started returns right away
+        # instead of sitting out a full BLPOP cycle first
+        if shutdown_event and shutdown_event.is_set():
+            logger.info("wait_for_message_shutdown agent=%s cycles=0", agent_id)
+            return "shutdown"
+
         # Block on notification channel
         notify_key = f"{self.NOTIFY_PREFIX}{agent_id}"
         deadline = datetime.now(timezone.utc).timestamp() + timeout
@@ -432,7 +432,9 @@ async def api_register(request):
     the same registration functionality via a simple REST endpoint.
 
     Requires X-Machine-Name header, optionally X-Project-Name and X-Session-ID.
-    Returns the assigned agent_id (may differ from requested if collision resolved).
+    Returns the assigned agent_id (may differ from requested if collision resolved),
+    plus agents_online (same count as /api/health) so the SessionStart hook
+    can report it without a second request.
     """
     auth_result = _authenticate_rest_request(request)
     if not auth_result.get("valid"):
@@ -480,6 +482,7 @@ async def api_register(request):
 
     try:
         result = agent_manager.register_agent(agent_id, session_id)
+        result["agents_online"] = agent_manager.count_online_agents()
         logger.info("rest_register agent_id=%s", result.get("id", agent_id))
         return JSONResponse(result)
     except Exception as e:
@@ -524,6 +527,16 @@ async def api_pending(request):
     or a composite machine/project in X-Machine-Name.
     Used by Stop hooks to check inbox.
     Does NOT consume messages - just peeks at the inbox.
+
+    Query params:
+        heartbeat: if "1", also refresh the agent's registration (same
+            effect as POST /agent/api/register without X-Session-ID), so
+            the Stop hook needs one round-trip instead of two. Skipped if
+            the agent ID does not match the API key's agent pattern. The
+            response then includes "heartbeat": true/false (whether it was
+            applied), so hooks can tell this server supports the parameter.
+            A failed refresh is logged and reported as false; it never fails
+            the pending check itself.
     """
     auth_result = _authenticate_rest_request(request)
     if not auth_result.get("valid"):
@@ -560,13 +573,26 @@ async def api_pending(request):
             status_code=400,
         )
 
+    result = {}
+    if request.query_params.get("heartbeat") == "1":
+        # Kept apart from the inbox read below: a failed heartbeat must not
+        # cost the Stop hook its pending check.
+        agent_pattern = auth_result.get("agent_pattern", "*")
+        heartbeat = AuthManager.validate_agent_pattern(agent_id, agent_pattern)
+        if heartbeat:
+            try:
+                agent_manager.register_agent(agent_id)
+            except Exception as e:
+                logger.warning("rest_pending_heartbeat_failed agent_id=%s error=%s", agent_id, e)
+                heartbeat = False
+        result["heartbeat"] = heartbeat
+
     try:
         messages = message_manager.get_messages(agent_id)
         logger.info("rest_pending agent_id=%s count=%d", agent_id, len(messages))
-        return JSONResponse({
-            "count": len(messages),
-            "messages": messages,
-        })
+        result["count"] = len(messages)
+        result["messages"] = messages
+        return JSONResponse(result)
     except Exception as e:
         return JSONResponse(
             {"error": str(e)},
@@ -1227,6 +1253,9 @@ def _register_agent_impl(
 AGENT_ID_PATTERN = re.compile(r"^[a-zA-Z0-9][a-zA-Z0-9_./-]{0,63}$")
 MAX_MESSAGE_LENGTH = 50000  # 50KB max message size
 MAX_WAIT_TIMEOUT = 3600  # 1 hour max
+# Claude.ai chat sessions pick their own ID as "anonymous/chat-<uuid>"
+ANON_CHAT_ID = "anonymous/chat"
+ANON_CHAT_PREFIX = f"{ANON_CHAT_ID}-"
 
 
 def _validate_agent_id(agent_id: str, field_name: str = "agent_id") -> None:
@@ -1688,14 +1717,14 @@ def _resolve_agent_id(ctx: Context, explicit_agent_id: Optional[str] = None) ->
         resolved = explicit_agent_id.strip()
 
         # Check for bare anonymous/chat (reject with onboarding instructions)
-        if resolved == "anonymous/chat":
+        if resolved == ANON_CHAT_ID:
             err = anonymous_onboarding_required()
             logger.warning("anonymous_onboarding_required session_id=%s", ctx.get_state("session_id"))
             raise ToolError(f"{err.message}\n\n{err.suggestion}")
 
         # Register anonymous/chat-* agents on first use
         # (they can't use the SessionStart hook because they lack headers)
-        if resolved.startswith("anonymous/chat-"):
+        if resolved.startswith(ANON_CHAT_PREFIX):
             session_id = ctx.get_state("session_id")
             registration = agent_manager.register_agent(resolved, session_id)
             logger.info("anonymous_agent_registered agent_id=%s", registration["id"])
@@ -0,0 +1,76 @@
+"""Shared fixtures for coordinator tests."""
+
+import fakeredis
+import pytest
+
+from coordinator.agents import AgentManager
+from coordinator.blobs import MAX_BLOB_SIZE, BlobManager
+from coordinator.messaging import MessageManager
+
+
+@pytest.fixture(scope="session")
+def server_module():
+    """Import coordinator.server once per run.
+
+    The first import registers every FastMCP tool and route, so fixtures
+    take the module from here instead of importing it themselves.
+    """
+    import coordinator.server as module
+
+    return module
+
+
+@pytest.fixture(scope="session")
+def http_app(server_module):
+    """Build the coordinator's Starlette app once per run.
+
+    Route handlers look up the module-level managers on every request, so
+    one app serves every test regardless of which managers it patched in.
+    """
+    return server_module.mcp.http_app()
+
+
+@pytest.fixture(scope="session")
+def fake_server():
+    """One fakeredis server per test process; clients created on it share storage.
+
+    Session fixtures are per worker under pytest-xdist, so parallel workers
+    never see each other's data.
+    """
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture(scope="session")
+def redis_client(fake_server):
+    """Create one fakeredis client; _flush empties it before each test."""
+    return fakeredis.FakeRedis(server=fake_server)
+
+
+@pytest.fixture(autouse=True)
+def _flush(redis_client):
+    """Start every test with an empty Redis (the managers hold no state)."""
+    redis_client.flushdb()
+
+
+@pytest.fixture(scope="session")
+def agent_manager(redis_client):
+    """Create AgentManager with fakeredis."""
+    return AgentManager(redis_client)
+
+
+@pytest.fixture(scope="session")
+def message_manager(redis_client):
+    """Create MessageManager with fakeredis."""
+    return MessageManager(redis_client)
+
+
+@pytest.fixture(scope="session")
+def blob_manager(redis_client):
+    """Create BlobManager with fakeredis."""
+    return BlobManager(redis_client)
+
+
+@pytest.fixture(scope="session")
+def oversized_payload():
+    """One byte over MAX_BLOB_SIZE; allocated once since it is 5MB."""
+    return b"x" * (MAX_BLOB_SIZE + 1)
@@ -4,23 +4,8 @@ import json
 import time
 from datetime import datetime, timedelta, timezone
 
-import fakeredis
 import pytest
 
-from coordinator.agents import AgentManager
-
-
-@pytest.fixture
-def redis_client():
-    """Create a fresh fakeredis client for each test."""
-    return fakeredis.FakeRedis()
-
-
-@pytest.fixture
-def agent_manager(redis_client):
-    """Create AgentManager with fakeredis."""
-    return AgentManager(redis_client)
-
 
 class TestRegisterAgent:
     """Tests for agent registration."""
@@ -2,17 +2,10 @@
 
 import json
 import pytest
-import fakeredis
 
 from coordinator.audit import AuditLogger, AUDIT_KEY
 
 
-@pytest.fixture
-def redis_client():
-    """Create a fresh fakeredis client for each test."""
-    return fakeredis.FakeRedis()
-
-
 @pytest.fixture
 def audit_logger(redis_client):
     """Create AuditLogger with fakeredis."""
@@ -1,21 +1,8 @@
 """Tests for C3PO blob storage."""
 
 import pytest
-import fakeredis
 
-from coordinator.blobs import BlobManager, BLOB_PREFIX, BLOB_TTL, MAX_BLOB_SIZE
-
-
-@pytest.fixture
-def redis_client():
-    """Create a fresh fakeredis client for each test."""
-    return fakeredis.FakeRedis()
-
-
-@pytest.fixture
-def blob_manager(redis_client):
-    """Create BlobManager with fakeredis."""
-    return BlobManager(redis_client)
+from coordinator.blobs import BLOB_PREFIX, BLOB_TTL, MAX_BLOB_SIZE
 
 
 class TestStoreBlob:
@@ -48,11 +35,10 @@ class TestStoreBlob:
         assert result is not None
         assert result[0] == content
 
-    def test_size_limit_enforced(self, blob_manager):
+    def test_size_limit_enforced(self, blob_manager, oversized_payload):
         """Should reject blobs exceeding MAX_BLOB_SIZE."""
-        content = b"x" * (MAX_BLOB_SIZE + 1)
         with pytest.raises(ValueError, match="exceeds maximum"):
-            blob_manager.store_blob(content, "too-big.txt")
+            blob_manager.store_blob(oversized_payload, "too-big.txt")
 
     def test_exactly_at_size_limit(self, blob_manager):
         """Should accept blobs exactly at MAX_BLOB_SIZE."""
@@ -11,35 +11,15 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 import fakeredis
 import pytest
 
-from coordinator.agents import AgentManager
 from coordinator.auth import AuthManager
-from coordinator.messaging import MessageManager
 from coordinator.rate_limit import RateLimiter
 from coordinator.server import _wait_for_message_impl
 
 
 # ---------------------------------------------------------------------------
-# Fixtures (inline, matching existing test pattern — no conftest.py exists)
+# Fixtures (redis_client and the managers come from conftest.py)
 # ---------------------------------------------------------------------------
 
-@pytest.fixture
-def redis_client():
-    """Create a fresh fakeredis client for each test."""
-    return fakeredis.FakeRedis()
-
-
-@pytest.fixture
-def message_manager(redis_client):
-    """Create MessageManager with fakeredis."""
-    return MessageManager(redis_client)
-
-
-@pytest.fixture
-def agent_manager(redis_client):
-    """Create AgentManager with fakeredis."""
-    return AgentManager(redis_client)
-
-
 @pytest.fixture
 def rate_limiter(redis_client):
     """Create RateLimiter with fakeredis."""
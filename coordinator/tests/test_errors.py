@@ -1,7 +1,6 @@
 """Tests for C3PO error handling."""
 
 import pytest
-import fakeredis
 from datetime import datetime, timezone, timedelta
 import json
 
@@ -16,8 +15,6 @@ from coordinator.server import (
     MAX_MESSAGE_LENGTH,
     MAX_WAIT_TIMEOUT,
 )
-from coordinator.agents import AgentManager
-from coordinator.messaging import MessageManager
 from coordinator.rate_limit import RateLimiter, RATE_LIMITS
 from coordinator.errors import (
     ErrorCodes,
@@ -30,24 +27,6 @@ from coordinator.errors import (
 from fastmcp.exceptions import ToolError
 
 
-@pytest.fixture
-def redis_client():
-    """Create a fresh fakeredis client for each test."""
-    return fakeredis.FakeRedis()
-
-
-@pytest.fixture
-def agent_manager(redis_client):
-    """Create AgentManager with fakeredis."""
-    return AgentManager(redis_client)
-
-
-@pytest.fixture
-def message_manager(redis_client):
-    """Create MessageManager with fakeredis."""
-    return MessageManager(redis_client)
-
-
 class TestErrorStructure:
     """Tests for structured error responses."""
 
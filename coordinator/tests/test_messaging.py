@@ -2,14 +2,11 @@
 
 import json
 import pytest
-import fakeredis
 import threading
 import time
 from datetime import datetime, timedelta, timezone
 from unittest.mock import patch
 
-from coordinator.messaging import MessageManager
-from coordinator.agents import AgentManager
 from coordinator.rate_limit import RateLimiter
 from coordinator.server import (
     _send_message_impl,
@@ -23,24 +20,6 @@ from coordinator.server import (
 from fastmcp.exceptions import ToolError
 
 
-@pytest.fixture
-def redis_client():
-    """Create a fresh fakeredis client for each test."""
-    return fakeredis.FakeRedis()
-
-
-@pytest.fixture
-def message_manager(redis_client):
-    """Create MessageManager with fakeredis."""
-    return MessageManager(redis_client)
-
-
-@pytest.fixture
-def agent_manager(redis_client):
-    """Create AgentManager with fakeredis."""
-    return AgentManager(redis_client)
-
-
 @pytest.fixture(autouse=False)
 def patch_rate_limiter(redis_client):
     """Patch server.rate_limiter to use fakeredis so tests don't need real Redis."""
@@ -71,6 +50,15 @@ class TestMessageManager:
         assert "reply_to" not in result  # No reply_to for normal messages
         # ID format should be {from}::{to}::{uuid}
         assert result["id"].startswith("agent-a::agent-b::")
+        assert result["urgent"] is False
+
+    def test_send_message_tags_urgent_messages(self, message_manager):
+        """send_message should flag keyword-matching messages as urgent."""
+        result = message_manager.send_message("a", "b", "Please CANCEL the deploy")
+        assert result["urgent"] is True
+
+        # The flag is stored, so peeking readers see it too
+        assert message_manager.peek_messages("b")[0]["urgent"] is True
 
     def test_get_pending_messages_retrieves_and_removes(self, message_manager):
         """get_pending_messages should retrieve and remove messages."""
@@ -470,11 +458,16 @@ class TestWaitForMessage:
         assert "messages" in result
         assert len(result["messages"]) >= 1
 
-    def test_shutdown_returns_sentinel(self, message_manager):
+    def test_shutdown_returns_sentinel(self, message_manager, monkeypatch):
         """wait_for_message should return 'shutdown' when shutdown_event is set."""
         import threading
         shutdown = threading.Event()
         shutdown.set()
+
+        def no_blpop(*args, **kwargs):
+            raise AssertionError("should not block once shutdown is set")
+
+        monkeypatch.setattr(message_manager.redis, "blpop", no_blpop)
         result = message_manager.wait_for_message(
             "agent-b", timeout=60, shutdown_event=shutdown,
         )
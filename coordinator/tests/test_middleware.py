@@ -9,35 +9,14 @@ server, which is covered by manual testing.
 import json
 from datetime import datetime, timezone, timedelta
 
-import fakeredis
 import pytest
 import pytest_asyncio
 from httpx import ASGITransport, AsyncClient
 from unittest.mock import MagicMock, patch, AsyncMock
 
-from coordinator.agents import AgentManager
-from coordinator.messaging import MessageManager
 from coordinator.server import AgentIdentityMiddleware
 
 
-@pytest.fixture
-def redis_client():
-    """Create a fresh fakeredis client for each test."""
-    return fakeredis.FakeRedis()
-
-
-@pytest.fixture
-def agent_manager(redis_client):
-    """Create AgentManager with fakeredis."""
-    return AgentManager(redis_client)
-
-
-@pytest.fixture
-def message_manager(redis_client):
-    """Create MessageManager with fakeredis."""
-    return MessageManager(redis_client)
-
-
 @pytest.fixture
 def mcp_app(redis_client, agent_manager, message_manager, monkeypatch):
     """Create the MCP app with test Redis client."""
@@ -1,17 +1,10 @@
 """Tests for C3PO comprehensive rate limiting."""
 
 import pytest
-import fakeredis
 
 from coordinator.rate_limit import RateLimiter, RATE_LIMITS
 
 
-@pytest.fixture
-def redis_client():
-    """Create a fresh fakeredis client for each test."""
-    return fakeredis.FakeRedis()
-
-
 @pytest.fixture
 def limiter(redis_client):
     """Create RateLimiter with fakeredis."""
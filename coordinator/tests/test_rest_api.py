@@ -1,47 +1,23 @@
 """Tests for REST API endpoints (/api/health, /agent/api/*, /admin/api/*)."""
 
-import fakeredis
 import pytest
 import pytest_asyncio
 from httpx import ASGITransport, AsyncClient
 
-from coordinator.agents import AgentManager
 from coordinator.audit import AuditLogger
 from coordinator.auth import AuthManager
 from coordinator.blobs import BlobManager
-from coordinator.messaging import MessageManager
 from coordinator.rate_limit import RateLimiter
 
 
-@pytest.fixture
-def redis_client():
-    """Create a fresh fakeredis client for each test."""
-    return fakeredis.FakeRedis()
-
-
-@pytest.fixture
-def agent_manager(redis_client):
-    """Create AgentManager with fakeredis."""
-    return AgentManager(redis_client)
-
-
-@pytest.fixture
-def message_manager(redis_client):
-    """Create MessageManager with fakeredis."""
-    return MessageManager(redis_client)
-
-
-@pytest.fixture
-def mcp_app(redis_client, agent_manager, message_manager, monkeypatch):
-    """Create the MCP app with test Redis client."""
+@pytest.fixture(autouse=True)
+def _patch_server(server_module, redis_client, agent_manager, message_manager, monkeypatch):
+    """Point the coordinator's module-level managers at this test's Redis."""
     # Disable auth for REST API tests (tests exercise endpoint logic, not auth)
     monkeypatch.delenv("C3PO_SERVER_SECRET", raising=False)
     monkeypatch.delenv("C3PO_PROXY_BEARER_TOKEN", raising=False)
     monkeypatch.delenv("C3PO_ADMIN_KEY", raising=False)
 
-    # Monkeypatch the module-level clients before importing server
-    import coordinator.server as server_module
-
     monkeypatch.setattr(server_module, "redis_client", redis_client)
     monkeypatch.setattr(server_module, "agent_manager", agent_manager)
     monkeypatch.setattr(server_module, "message_manager", message_manager)
@@ -50,13 +26,15 @@ def mcp_app(redis_client, agent_manager, message_manager, monkeypatch):
     monkeypatch.setattr(server_module, "audit_logger", AuditLogger(redis_client))
     monkeypatch.setattr(server_module, "blob_manager", BlobManager(redis_client))
 
-    return server_module.mcp.http_app()
-
 
 @pytest_asyncio.fixture
-async def client(mcp_app):
-    """Create async test client."""
-    transport = ASGITransport(app=mcp_app)
+async def client(http_app):
+    """Create async test client on the test's own event loop.
+
+    The app itself is built once per session (http_app); the client is
+    cheap to create, since ASGITransport never runs the app's lifespan.
+    """
+    transport = ASGITransport(app=http_app)
     async with AsyncClient(transport=transport, base_url="http://test") as ac:
         yield ac
 
@@ -64,7 +42,6 @@ async def client(mcp_app):
 class TestHealthEndpoint:
     """Tests for /api/health endpoint."""
 
-    @pytest.mark.asyncio
     async def test_health_returns_ok(self, client):
         """Health endpoint should return status ok."""
         response = await client.get("/api/health")
@@ -73,7 +50,6 @@ class TestHealthEndpoint:
         data = response.json()
         assert data["status"] == "ok"
 
-    @pytest.mark.asyncio
     async def test_health_returns_agents_online_count(self, client, agent_manager):
         """Health endpoint should return count of online agents."""
         # Initially no agents
@@ -93,7 +69,6 @@ class TestHealthEndpoint:
 class TestPendingEndpoint:
     """Tests for /agent/api/pending endpoint."""
 
-    @pytest.mark.asyncio
     async def test_pending_requires_machine_name_header(self, client):
         """Pending endpoint should require X-Machine-Name header."""
         response = await client.get("/agent/api/pending")
@@ -102,7 +77,6 @@ class TestPendingEndpoint:
         data = response.json()
         assert "Missing X-Machine-Name header" in data["error"]
 
-    @pytest.mark.asyncio
     async def test_pending_returns_empty_for_unknown_agent(self, client):
         """Pending endpoint should return empty for unknown agent."""
         response = await client.get(
@@ -114,7 +88,6 @@ class TestPendingEndpoint:
         assert data["count"] == 0
         assert data["messages"] == []
 
-    @pytest.mark.asyncio
     async def test_pending_rejects_bare_machine_name(self, client):
         """Pending endpoint should reject bare machine name without project."""
         response = await client.get(
@@ -124,7 +97,6 @@ class TestPendingEndpoint:
         assert response.status_code == 400
         assert "Bare machine name" in response.json()["error"]
 
-    @pytest.mark.asyncio
     async def test_pending_returns_count_without_consuming(
         self, client, message_manager, agent_manager
     ):
@@ -155,7 +127,6 @@ class TestPendingEndpoint:
         data = response.json()
         assert data["count"] == 1
 
-    @pytest.mark.asyncio
     async def test_pending_returns_multiple_messages(
         self, client, message_manager, agent_manager
     ):
@@ -183,7 +154,6 @@ class TestPendingEndpoint:
         assert data["messages"][2]["message"] == "Message 3"
 
 
-    @pytest.mark.asyncio
     async def test_pending_filters_acked_messages(
         self, client, message_manager, agent_manager
     ):
@@ -208,11 +178,52 @@ class TestPendingEndpoint:
         assert data["count"] == 1
         assert data["messages"][0]["message"] == "Message 2"
 
+    async def test_pending_without_heartbeat_does_not_register(self, client, agent_manager):
+        """Plain pending check should not create or refresh the agent."""
+        response = await client.get(
+            "/agent/api/pending", headers={"X-Machine-Name": "receiver/proj"}
+        )
+        assert "heartbeat" not in response.json()
+        assert agent_manager.get_agent("receiver/proj") is None
+
+    async def test_pending_heartbeat_refreshes_last_seen(self, client, agent_manager):
+        """heartbeat=1 should register/refresh the agent alongside the pending check."""
+        response = await client.get(
+            "/agent/api/pending?heartbeat=1",
+            headers={"X-Machine-Name": "receiver/proj"},
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["count"] == 0
+        assert data["heartbeat"] is True
+
+        agent = agent_manager.get_agent("receiver/proj")
+        assert agent is not None
+        assert agent["status"] == "online"
+
+    async def test_pending_heartbeat_failure_still_returns_messages(
+        self, client, agent_manager, message_manager, monkeypatch
+    ):
+        """A failed heartbeat should be reported, not fail the pending check."""
+        message_manager.send_message("sender/proj", "receiver/proj", "hello")
+
+        def fail_register(agent_id):
+            raise ConnectionError("redis down")
+
+        monkeypatch.setattr(agent_manager, "register_agent", fail_register)
+        response = await client.get(
+            "/agent/api/pending?heartbeat=1",
+            headers={"X-Machine-Name": "receiver/proj"},
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["heartbeat"] is False
+        assert data["count"] == 1
+
 
 class TestUnregisterEndpoint:
     """Tests for /agent/api/unregister endpoint."""
 
-    @pytest.mark.asyncio
     async def test_unregister_requires_machine_name_header(self, client):
         """Unregister endpoint should require X-Machine-Name header."""
         response = await client.post("/agent/api/unregister")
@@ -221,7 +232,6 @@ class TestUnregisterEndpoint:
         data = response.json()
         assert "Missing X-Machine-Name header" in data["error"]
 
-    @pytest.mark.asyncio
     async def test_unregister_removes_registered_agent(self, client, agent_manager, redis_client):
         """Unregister endpoint should remove a registered agent and clean up inbox key."""
         # Register an agent first
@@ -247,7 +257,6 @@ class TestUnregisterEndpoint:
         assert redis_client.llen(inbox_key) == 0
         assert redis_client.exists(inbox_key) == 0
 
-    @pytest.mark.asyncio
     async def test_unregister_unknown_agent_returns_ok(self, client, agent_manager):
         """Unregister endpoint should succeed for unknown agent (idempotent)."""
         # Verify agent doesn't exist
@@ -263,7 +272,6 @@ class TestUnregisterEndpoint:
         assert data["status"] == "ok"
         assert "not registered" in data["message"]
 
-    @pytest.mark.asyncio
     async def test_unregister_does_not_affect_other_agents(self, client, agent_manager):
         """Unregister should only remove the specified agent."""
         # Register multiple agents
@@ -283,7 +291,6 @@ class TestUnregisterEndpoint:
         assert agent_manager.get_agent("machine/agent-2") is None
         assert agent_manager.get_agent("machine/agent-3") is not None
 
-    @pytest.mark.asyncio
     async def test_unregister_reflects_in_agent_count(self, client, agent_manager):
         """Unregistered agent should be reflected in health endpoint count."""
         # Register agents
@@ -301,7 +308,6 @@ class TestUnregisterEndpoint:
         response = await client.get("/api/health")
         assert response.json()["agents_online"] == 1
 
-    @pytest.mark.asyncio
     async def test_unregister_with_pending_messages_keeps_registry(
         self, client, agent_manager, message_manager
     ):
@@ -326,7 +332,6 @@ class TestUnregisterEndpoint:
         assert agent is not None
         assert agent["status"] == "offline"
 
-    @pytest.mark.asyncio
     async def test_unregister_with_keep_param_keeps_empty_registry(
         self, client, agent_manager
     ):
@@ -348,7 +353,6 @@ class TestUnregisterEndpoint:
         assert agent is not None
         assert agent["status"] == "offline"
 
-    @pytest.mark.asyncio
     async def test_unregister_with_empty_inbox_deletes_inbox_key(
         self, client, agent_manager, redis_client, message_manager
     ):
@@ -365,7 +369,6 @@ class TestUnregisterEndpoint:
         inbox_key = "c3po:inbox:machine/clean-exit"
         assert redis_client.exists(inbox_key) == 0
 
-    @pytest.mark.asyncio
     async def test_api_wait_returns_immediately_if_messages_exist(
         self, client, agent_manager, message_manager
     ):
@@ -385,7 +388,6 @@ class TestUnregisterEndpoint:
         assert len(data["messages"]) == 1
         assert data["messages"][0]["message"] == "you have mail"
 
-    @pytest.mark.asyncio
     async def test_api_wait_times_out_with_no_messages(self, client, agent_manager):
         """GET /agent/api/wait with empty inbox should return timeout after ~1s."""
         agent_manager.register_agent("machine/empty-waiter")
@@ -405,7 +407,6 @@ class TestUnregisterEndpoint:
         assert data["count"] == 0
         assert elapsed >= 1.0  # Should have waited at least 1 second
 
-    @pytest.mark.asyncio
     async def test_api_wait_does_not_touch_heartbeat(self, client, agent_manager, redis_client):
         """GET /agent/api/wait should NOT update last_seen (watcher pattern)."""
         import json as _json
@@ -429,11 +430,9 @@ class TestUnregisterEndpoint:
         # last_seen should be unchanged (heartbeat not touched)
         assert after_last_seen == before_last_seen
 
-    @pytest.mark.asyncio
-    async def test_api_wait_returns_retry_on_shutdown(self, client, agent_manager):
+    async def test_api_wait_returns_retry_on_shutdown(self, server_module, client, agent_manager):
         """GET /agent/api/wait returns status=retry with Retry-After header on server shutdown."""
         import asyncio
-        import coordinator.server as server_module
         import threading
 
         agent_manager.register_agent("machine/shutdown-waiter")
@@ -472,14 +471,12 @@ class TestUnregisterEndpoint:
 class TestRegisterEndpoint:
     """Tests for /agent/api/register endpoint."""
 
-    @pytest.mark.asyncio
     async def test_register_requires_machine_name_header(self, client):
         """Register endpoint should require X-Machine-Name header."""
         response = await client.post("/agent/api/register")
         assert response.status_code == 400
         assert "Missing X-Machine-Name header" in response.json()["error"]
 
-    @pytest.mark.asyncio
     async def test_register_with_machine_and_project(self, client):
         """Register endpoint should construct agent ID from machine + project."""
         response = await client.post(
@@ -493,7 +490,6 @@ class TestRegisterEndpoint:
         data = response.json()
         assert data["id"] == "macbook/myproject"
 
-    @pytest.mark.asyncio
     async def test_register_with_composite_machine_name(self, client):
         """Register endpoint should accept composite machine/project in X-Machine-Name."""
         response = await client.post(
@@ -505,10 +501,20 @@ class TestRegisterEndpoint:
         assert data["id"] == "macbook/myproject"
 
 
+    async def test_register_includes_agents_online(self, client, agent_manager):
+        """Register response should carry the online agent count, including the new agent."""
+        agent_manager.register_agent("other/proj")
+        response = await client.post(
+            "/agent/api/register",
+            headers={"X-Machine-Name": "macbook/myproject"},
+        )
+        assert response.status_code == 200
+        assert response.json()["agents_online"] == 2
+
+
 class TestAdminKeyEndpoints:
     """Tests for /admin/api/keys endpoints (dev mode - no auth)."""
 
-    @pytest.mark.asyncio
     async def test_create_key(self, client):
         """Should create an API key."""
         response = await client.post(
@@ -521,7 +527,6 @@ class TestAdminKeyEndpoints:
         assert "api_key" in data
         assert data["agent_pattern"] == "macbook/*"
 
-    @pytest.mark.asyncio
     async def test_list_keys(self, client):
         """Should list API keys."""
         # Create a key first
@@ -535,7 +540,6 @@ class TestAdminKeyEndpoints:
         assert "keys" in data
         assert len(data["keys"]) == 1
 
-    @pytest.mark.asyncio
     async def test_revoke_key(self, client):
         """Should revoke an API key."""
         # Create a key first
@@ -554,7 +558,6 @@ class TestAdminKeyEndpoints:
         list_resp = await client.get("/admin/api/keys")
         assert len(list_resp.json()["keys"]) == 0
 
-    @pytest.mark.asyncio
     async def test_revoke_nonexistent_key(self, client):
         """Should return 404 for nonexistent key."""
         response = await client.delete("/admin/api/keys/nonexistent")
@@ -564,7 +567,6 @@ class TestAdminKeyEndpoints:
 class TestInputValidation:
     """Tests for REST endpoint input validation."""
 
-    @pytest.mark.asyncio
     async def test_pending_rejects_invalid_agent_id_format(self, client):
         """Pending endpoint should reject invalid agent ID format."""
         response = await client.get(
@@ -575,7 +577,6 @@ class TestInputValidation:
         data = response.json()
         assert "Invalid" in data["error"]
 
-    @pytest.mark.asyncio
     async def test_pending_accepts_valid_agent_id(self, client):
         """Pending endpoint should accept valid agent ID format."""
         response = await client.get(
@@ -586,7 +587,6 @@ class TestInputValidation:
         data = response.json()
         assert "count" in data
 
-    @pytest.mark.asyncio
     async def test_unregister_rejects_invalid_agent_id_format(self, client):
         """Unregister endpoint should reject invalid agent ID format."""
         response = await client.post(
@@ -597,7 +597,6 @@ class TestInputValidation:
         data = response.json()
         assert "Invalid" in data["error"]
 
-    @pytest.mark.asyncio
     async def test_unregister_accepts_valid_agent_id(self, client):
         """Unregister endpoint should accept valid agent ID format."""
         response = await client.post(
@@ -610,7 +609,6 @@ class TestInputValidation:
 class TestBlobUploadEndpoint:
     """Tests for /agent/api/blob POST endpoint."""
 
-    @pytest.mark.asyncio
     async def test_upload_raw_body(self, client):
         """Should accept raw body upload with headers."""
         response = await client.post(
@@ -630,7 +628,6 @@ class TestBlobUploadEndpoint:
         assert data["size"] == 11
         assert "expires_in" in data
 
-    @pytest.mark.asyncio
     async def test_upload_empty_body(self, client):
         """Should reject empty upload."""
         response = await client.post(
@@ -641,12 +638,11 @@ class TestBlobUploadEndpoint:
 
         assert response.status_code == 400
 
-    @pytest.mark.asyncio
-    async def test_upload_too_large(self, client):
+    async def test_upload_too_large(self, client, oversized_payload):
         """Should reject upload over 5MB."""
         response = await client.post(
             "/agent/api/blob",
-            content=b"x" * (5 * 1024 * 1024 + 1),
+            content=oversized_payload,
             headers={"X-Filename": "big.bin"},
         )
 
@@ -656,7 +652,6 @@ class TestBlobUploadEndpoint:
 class TestBlobDownloadEndpoint:
     """Tests for /agent/api/blob/{blob_id} GET endpoint."""
 
-    @pytest.mark.asyncio
     async def test_download_existing_blob(self, client):
         """Should return blob content with correct headers."""
         # Upload first
@@ -679,7 +674,6 @@ class TestBlobDownloadEndpoint:
         assert "text/plain" in response.headers["content-type"]
         assert "test.txt" in response.headers["content-disposition"]
 
-    @pytest.mark.asyncio
     async def test_download_not_found(self, client):
         """Should return 404 for non-existent blob."""
         response = await client.get("/agent/api/blob/blob-doesnotexist")
@@ -688,7 +682,6 @@ class TestBlobDownloadEndpoint:
         data = response.json()
         assert data["code"] == "BLOB_NOT_FOUND"
 
-    @pytest.mark.asyncio
     async def test_download_binary_blob(self, client):
         """Should handle binary content correctly."""
         binary_data = bytes(range(256))
@@ -710,7 +703,6 @@ class TestBlobDownloadEndpoint:
 class TestAdminListAgentsEndpoint:
     """Tests for GET /admin/api/agents endpoint."""
 
-    @pytest.mark.asyncio
     async def test_list_returns_empty_when_no_agents(self, client):
         """Should return empty list when no agents registered."""
         response = await client.get("/admin/api/agents")
@@ -720,7 +712,6 @@ class TestAdminListAgentsEndpoint:
         assert data["agents"] == []
         assert data["count"] == 0
 
-    @pytest.mark.asyncio
     async def test_list_returns_agents_with_status(self, client, agent_manager):
         """Should return agents with their status."""
         agent_manager.register_agent("machine/proj1")
@@ -737,7 +728,6 @@ class TestAdminListAgentsEndpoint:
         for agent in data["agents"]:
             assert agent["status"] == "online"
 
-    @pytest.mark.asyncio
     async def test_filter_by_status_online(self, client, agent_manager, redis_client):
         """Should filter to only online agents."""
         import json
@@ -761,7 +751,6 @@ class TestAdminListAgentsEndpoint:
         assert result["count"] == 1
         assert result["agents"][0]["id"] == "machine/online-agent"
 
-    @pytest.mark.asyncio
     async def test_filter_by_status_offline(self, client, agent_manager, redis_client):
         """Should filter to only offline agents."""
         import json
@@ -785,7 +774,6 @@ class TestAdminListAgentsEndpoint:
         assert result["count"] == 1
         assert result["agents"][0]["id"] == "machine/offline-agent"
 
-    @pytest.mark.asyncio
     async def test_filter_by_pattern(self, client, agent_manager):
         """Should filter agents by fnmatch pattern."""
         agent_manager.register_agent("stress/sender-0")
@@ -800,7 +788,6 @@ class TestAdminListAgentsEndpoint:
         agent_ids = {a["id"] for a in result["agents"]}
         assert agent_ids == {"stress/sender-0", "stress/sender-1"}
 
-    @pytest.mark.asyncio
     async def test_filter_by_status_and_pattern(self, client, agent_manager, redis_client):
         """Should combine status and pattern filters."""
         import json
@@ -826,7 +813,6 @@ class TestAdminListAgentsEndpoint:
         assert result["count"] == 1
         assert result["agents"][0]["id"] == "stress/offline"
 
-    @pytest.mark.asyncio
     async def test_invalid_status_returns_400(self, client):
         """Should reject invalid status values."""
         response = await client.get("/admin/api/agents?status=invalid")
@@ -834,7 +820,6 @@ class TestAdminListAgentsEndpoint:
         assert response.status_code == 400
         assert "Invalid status" in response.json()["error"]
 
-    @pytest.mark.asyncio
     async def test_filter_by_status_watching(self, client, agent_manager):
         """Should filter to only watching agents (offline + webhook)."""
         # One online, one offline, one watching (offline + webhook)
@@ -852,7 +837,6 @@ class TestAdminListAgentsEndpoint:
         assert result["count"] == 1
         assert result["agents"][0]["id"] == "machine/watching-agent"
 
-    @pytest.mark.asyncio
     async def test_status_filter_accepts_watching(self, client, agent_manager):
         """?status=watching should not return 400."""
         response = await client.get("/admin/api/agents?status=watching")
@@ -862,7 +846,6 @@ class TestAdminListAgentsEndpoint:
 class TestAdminBulkRemoveEndpoint:
     """Tests for DELETE /admin/api/agents endpoint."""
 
-    @pytest.mark.asyncio
     async def test_requires_pattern_parameter(self, client):
         """Should return 400 when pattern query param is missing."""
         response = await client.delete("/admin/api/agents")
@@ -870,7 +853,6 @@ class TestAdminBulkRemoveEndpoint:
         assert response.status_code == 400
         assert "pattern" in response.json()["error"].lower()
 
-    @pytest.mark.asyncio
     async def test_rejects_wildcard_star(self, client):
         """Should reject bare * pattern as safety guard."""
         response = await client.delete("/admin/api/agents?pattern=*")
@@ -878,7 +860,6 @@ class TestAdminBulkRemoveEndpoint:
         assert response.status_code == 400
         assert "Refusing" in response.json()["error"]
 
-    @pytest.mark.asyncio
     async def test_removes_matching_agents(self, client, agent_manager):
         """Should remove agents matching the pattern and return count."""
         agent_manager.register_agent("stress/sender-0")
@@ -898,7 +879,6 @@ class TestAdminBulkRemoveEndpoint:
         assert agent_manager.get_agent("stress/sender-0") is None
         assert agent_manager.get_agent("other/agent") is not None
 
-    @pytest.mark.asyncio
     async def test_no_matches_returns_zero(self, client, agent_manager):
         """Should return removed: 0 when no agents match."""
         agent_manager.register_agent("other/agent")
@@ -910,7 +890,6 @@ class TestAdminBulkRemoveEndpoint:
         assert data["removed"] == 0
         assert data["agent_ids"] == []
 
-    @pytest.mark.asyncio
     async def test_empty_pattern_rejected(self, client):
         """Should reject empty pattern."""
         response = await client.delete("/admin/api/agents?pattern=")
@@ -918,7 +897,6 @@ class TestAdminBulkRemoveEndpoint:
         assert response.status_code == 400
         assert "pattern" in response.json()["error"].lower()
 
-    @pytest.mark.asyncio
     async def test_delete_with_status_offline_only_removes_offline(
         self, client, agent_manager, redis_client
     ):
@@ -948,7 +926,6 @@ class TestAdminBulkRemoveEndpoint:
         assert agent_manager.get_agent("test/online-agent") is not None
         assert agent_manager.get_agent("test/offline-agent") is None
 
-    @pytest.mark.asyncio
     async def test_delete_wildcard_with_status_is_allowed(
         self, client, agent_manager, redis_client
     ):
@@ -975,7 +952,6 @@ class TestAdminBulkRemoveEndpoint:
         assert result["agent_ids"] == ["b/offline"]
         assert agent_manager.get_agent("a/online") is not None
 
-    @pytest.mark.asyncio
     async def test_delete_wildcard_without_status_still_rejected(self, client):
         """DELETE with pattern=* without status should still be rejected."""
         response = await client.delete("/admin/api/agents?pattern=*")
@@ -983,7 +959,6 @@ class TestAdminBulkRemoveEndpoint:
         assert response.status_code == 400
         assert "Refusing" in response.json()["error"]
 
-    @pytest.mark.asyncio
     async def test_delete_with_status_only_no_pattern(
         self, client, agent_manager, redis_client
     ):
@@ -1012,7 +987,6 @@ class TestAdminBulkRemoveEndpoint:
 class TestValidateEndpoint:
     """Tests for GET /agent/api/validate endpoint (dev mode, no auth)."""
 
-    @pytest.mark.asyncio
     async def test_validate_returns_200(self, client):
         """Validate endpoint should return 200 with valid/key_id/agent_pattern."""
         response = await client.get("/agent/api/validate")
@@ -1023,7 +997,6 @@ class TestValidateEndpoint:
         assert "key_id" in data
         assert "agent_pattern" in data
 
-    @pytest.mark.asyncio
     async def test_validate_with_machine_name(self, client):
         """Validate with machine_name should pass (wildcard pattern in dev mode)."""
         response = await client.get("/agent/api/validate?machine_name=docker")
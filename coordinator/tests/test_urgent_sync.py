@@ -0,0 +1,44 @@
+"""Sync test: verifies the hooks' urgency fallback agrees with the coordinator's urgent flag."""
+
+import importlib.util
+import os
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+C3PO_COMMON_PATH = os.path.join(REPO_ROOT, "hooks", "c3po_common.py")
+
+# Messages on both sides of each keyword, including case and substring matches
+SAMPLE_MESSAGES = [
+    ("URGENT: need help", True),
+    ("please interrupt what you're doing", True),
+    ("Build was cancelled", True),
+    ("reply asap", True),
+    ("Emergency rollback in progress", True),
+    ("Critical failure in prod", True),
+    ("Can you review my PR when you get a chance?", False),
+    ("Deploy finished, all green", False),
+    ("", False),
+]
+
+
+@pytest.fixture(scope="module")
+def c3po_common():
+    """Load hooks/c3po_common.py (stdlib-only, not an installed package)."""
+    spec = importlib.util.spec_from_file_location("c3po_common", C3PO_COMMON_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class TestUrgentSync:
+    """Hooks fall back to their own keyword scan for messages without the flag."""
+
+    @pytest.mark.parametrize("message,expected", SAMPLE_MESSAGES)
+    def test_coordinator_flag(self, message_manager, message, expected):
+        result = message_manager.send_message("a", "b", message)
+        assert result["urgent"] is expected
+
+    @pytest.mark.parametrize("message,expected", SAMPLE_MESSAGES)
+    def test_hook_fallback_matches_coordinator(self, c3po_common, message, expected):
+        assert c3po_common.is_urgent({"message": message}) is expected
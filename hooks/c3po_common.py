@@ -12,15 +12,53 @@ import json
 import os
 import platform
 import re
-import ssl
 import sys
-import urllib.request
+from typing import TYPE_CHECKING
+
+# ssl, http.client and urllib are imported where they are used: together they
+# account for most of this module's import time, and ensure_agent_id (run on
+# every c3po tool call) never makes a network request.
+if TYPE_CHECKING:
+    import http.client
+    import ssl
 
 
 CREDENTIALS_FILE = os.path.expanduser("~/.claude/c3po-credentials.json")
 
-# Characters allowed in agent IDs (must match AGENT_ID_PATTERN in coordinator/server.py)
-_AGENT_ID_SAFE = re.compile(r"[^a-zA-Z0-9_./-]")
+# Runs of characters not allowed in agent IDs (must match AGENT_ID_PATTERN in
+# coordinator/server.py), together with any hyphens next to them. Hyphen is
+# left out of the class so a run like "-@-" becomes a single "-".
+_AGENT_ID_UNSAFE_RUN = re.compile(r"[^a-zA-Z0-9_./]+")
+
+# Default value in a shell-style "${VAR:-default}" MCP header
+_SHELL_DEFAULT_RE = re.compile(r"\$\{[^:}]+:-([^}]+)\}")
+
+# Fallback urgency check for messages from coordinators that predate the
+# stored "urgent" flag. Must match URGENT_RE in coordinator/messaging.py,
+# which is the source of truth (coordinator/tests/test_urgent_sync.py checks
+# they classify messages the same way).
+_LEGACY_URGENT_RE = re.compile(r"urgent|interrupt|cancel|asap|emergency|critical", re.IGNORECASE)
+
+
+def is_urgent(msg: dict) -> bool:
+    """Return whether a pending message is urgent.
+
+    Uses the coordinator's "urgent" flag, set once when the message is
+    stored. Messages from older coordinators lack the flag, so fall back to
+    the same keyword scan the coordinator uses.
+    """
+    urgent = msg.get("urgent")
+    if urgent is None:
+        return _LEGACY_URGENT_RE.search(msg.get("message", "")) is not None
+    return bool(urgent)
+
+
+def truncate(text: str, limit: int) -> str:
+    """Return text cut to limit chars, with "..." appended if it was cut.
+
+    Used by the hooks to build message previews.
+    """
+    return text if len(text) <= limit else f"{text[:limit]}..."
 
 
 def sanitize_name(name: str) -> str:
@@ -29,26 +67,33 @@ def sanitize_name(name: str) -> str:
     Replaces characters not allowed by the coordinator's AGENT_ID_PATTERN
     with hyphens and collapses consecutive hyphens.
     """
-    result = _AGENT_ID_SAFE.sub("-", name)
-    # Collapse consecutive hyphens
-    while "--" in result:
-        result = result.replace("--", "-")
-    return result.strip("-")
+    return _AGENT_ID_UNSAFE_RUN.sub("-", name).strip("-")
+
+
+# Parsed credentials by file path. get_coordinator_url and auth_headers both
+# need them within one hook run, so the file is only read and parsed once.
+_CREDENTIALS_CACHE: dict[str, dict] = {}
 
 
 def get_credentials() -> dict:
     """Load credentials from ~/.claude/c3po-credentials.json.
 
+    The file is parsed once per process; later calls return a copy of the
+    cached result (save_credentials keeps the cache up to date).
+
     Returns:
         Dict with coordinator_url, api_token, key_id, agent_pattern.
         Also supports legacy format with server_secret + api_key.
         Returns empty dict if file doesn't exist or is invalid.
     """
-    try:
-        with open(CREDENTIALS_FILE) as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError, PermissionError):
-        return {}
+    path = CREDENTIALS_FILE
+    if path not in _CREDENTIALS_CACHE:
+        try:
+            with open(path) as f:
+                _CREDENTIALS_CACHE[path] = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError, PermissionError):
+            _CREDENTIALS_CACHE[path] = {}
+    return dict(_CREDENTIALS_CACHE[path])
 
 
 def save_credentials(credentials: dict) -> None:
@@ -62,6 +107,26 @@ def save_credentials(credentials: dict) -> None:
     with os.fdopen(fd, "w") as f:
         json.dump(credentials, f, indent=2)
         f.write("\n")
+    _CREDENTIALS_CACHE[CREDENTIALS_FILE] = dict(credentials)
+
+
+# Parsed ~/.claude.json by file path. get_machine_name and get_coordinator_url
+# both read the c3po MCP entry, and the file can be large (it holds project
+# history), so it is parsed at most once per process.
+_CLAUDE_JSON_CACHE: dict[str, dict] = {}
+
+
+def _c3po_mcp_config() -> dict:
+    """Return the c3po entry under mcpServers in ~/.claude.json, or {}."""
+    path = os.path.expanduser("~/.claude.json")
+    if path not in _CLAUDE_JSON_CACHE:
+        try:
+            with open(path) as f:
+                config = json.load(f)
+            _CLAUDE_JSON_CACHE[path] = config.get("mcpServers", {}).get("c3po", {})
+        except (FileNotFoundError, json.JSONDecodeError, AttributeError):
+            _CLAUDE_JSON_CACHE[path] = {}
+    return _CLAUDE_JSON_CACHE[path]
 
 
 def get_machine_name() -> str:
@@ -77,24 +142,15 @@ def get_machine_name() -> str:
         return machine_name
 
     # Read from ~/.claude.json MCP header config
-    claude_json = os.path.expanduser("~/.claude.json")
-    try:
-        with open(claude_json) as f:
-            config = json.load(f)
-        mcp_servers = config.get("mcpServers", {})
-        c3po_config = mcp_servers.get("c3po", {})
-        headers = c3po_config.get("headers", {})
-        header_value = headers.get("X-Machine-Name", "")
-        if header_value:
-            # Parse shell variable syntax: "${C3PO_MACHINE_NAME:-default}"
-            match = re.match(r'\$\{[^:}]+:-([^}]+)\}', header_value)
-            if match:
-                return match.group(1)
-            # Plain value (no shell syntax)
-            if not header_value.startswith("$"):
-                return header_value
-    except (FileNotFoundError, json.JSONDecodeError, KeyError):
-        pass
+    header_value = _c3po_mcp_config().get("headers", {}).get("X-Machine-Name", "")
+    if header_value:
+        # Parse shell variable syntax: "${C3PO_MACHINE_NAME:-default}"
+        match = _SHELL_DEFAULT_RE.match(header_value)
+        if match:
+            return match.group(1)
+        # Plain value (no shell syntax)
+        if not header_value.startswith("$"):
+            return header_value
 
     return platform.node().split('.')[0]
 
@@ -116,21 +172,12 @@ def get_coordinator_url() -> str:
     if url := creds.get("coordinator_url"):
         return url
 
-    claude_json = os.path.expanduser("~/.claude.json")
-    try:
-        with open(claude_json) as f:
-            config = json.load(f)
-        mcp_servers = config.get("mcpServers", {})
-        c3po_config = mcp_servers.get("c3po", {})
-        url = c3po_config.get("url", "")
-        if url:
-            # Strip /agent/mcp or /oauth/mcp suffix to get base URL
-            for suffix in ("/agent/mcp", "/oauth/mcp", "/mcp-headless", "/mcp"):
-                if url.endswith(suffix):
-                    return url[:-len(suffix)]
-            return url
-    except (FileNotFoundError, json.JSONDecodeError, KeyError):
-        pass
+    if url := _c3po_mcp_config().get("url", ""):
+        # Strip /agent/mcp or /oauth/mcp suffix to get base URL
+        for suffix in ("/agent/mcp", "/oauth/mcp", "/mcp-headless", "/mcp"):
+            if url.endswith(suffix):
+                return url[:-len(suffix)]
+        return url
 
     return "http://localhost:8420"
 
@@ -143,6 +190,8 @@ def get_ssl_context() -> ssl.SSLContext | None:
     """
     ca_cert = os.environ.get("C3PO_CA_CERT")
     if ca_cert:
+        import ssl
+
         ctx = ssl.create_default_context(cafile=ca_cert)
         return ctx
     return None
@@ -150,12 +199,81 @@ def get_ssl_context() -> ssl.SSLContext | None:
 
 def urlopen_with_ssl(req, timeout=5):
     """Open a URL request with optional custom SSL context."""
+    import urllib.request
+
     ctx = get_ssl_context()
     if ctx:
         return urllib.request.urlopen(req, timeout=timeout, context=ctx)
     return urllib.request.urlopen(req, timeout=timeout)
 
 
+# Open coordinator connections, keyed by (scheme, netloc). Lives for the
+# duration of one hook process so consecutive calls share a TCP/TLS session.
+_CONNECTIONS: dict[tuple[str, str], http.client.HTTPConnection] = {}
+
+
+def keepalive_request(
+    method: str,
+    url: str,
+    headers: dict | None = None,
+    body: bytes | None = None,
+    timeout: float = 5,
+    connect_timeout: float | None = None,
+) -> tuple[int, bytes]:
+    """Send an HTTP request, reusing this process's connection to the host.
+
+    Unlike urlopen_with_ssl, non-2xx responses are returned rather than
+    raised. If a reused connection turns out to have been closed by the
+    server, it is discarded and the request is retried once on a fresh one.
+
+    connect_timeout, if given, bounds opening a new connection (TCP connect
+    plus TLS handshake) separately from timeout, which then applies to each
+    socket read. An unreachable coordinator fails in connect_timeout
+    seconds instead of timeout.
+
+    Returns:
+        (status, body) tuple.
+    """
+    import http.client
+    from urllib.parse import urlsplit
+
+    parts = urlsplit(url)
+    key = (parts.scheme, parts.netloc)
+    path = parts.path or "/"
+    if parts.query:
+        path += f"?{parts.query}"
+
+    while True:
+        conn = _CONNECTIONS.get(key)
+        reused = conn is not None
+        if conn is None:
+            open_timeout = timeout if connect_timeout is None else connect_timeout
+            if parts.scheme == "https":
+                conn = http.client.HTTPSConnection(
+                    parts.netloc, timeout=open_timeout, context=get_ssl_context()
+                )
+            else:
+                conn = http.client.HTTPConnection(parts.netloc, timeout=open_timeout)
+            _CONNECTIONS[key] = conn
+        try:
+            if not reused and connect_timeout is not None:
+                conn.connect()
+                conn.sock.settimeout(timeout)
+                conn.timeout = timeout
+            conn.request(method, path, body=body, headers=headers or {})
+            resp = conn.getresponse()
+            return resp.status, resp.read()
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            conn.close()
+            del _CONNECTIONS[key]
+            if not reused:
+                raise
+        except Exception:
+            conn.close()
+            del _CONNECTIONS[key]
+            raise
+
+
 def auth_headers() -> dict:
     """Return authentication headers for hook REST calls.
 
@@ -211,17 +329,23 @@ def save_agent_id(session_id: str, agent_id: str) -> None:
     """Save the assigned agent_id for other hooks to read.
 
     Uses os.open with 0o600 permissions to prevent other users from
-    reading agent identity files.
+    reading agent identity files. The ID is written to a temp file and
+    renamed into place, so ensure_agent_id (which may be polling for the
+    file) never sees it empty or half-written.
     """
+    path = get_agent_id_file(session_id)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
     try:
-        path = get_agent_id_file(session_id)
-        fd = os.open(path, os.O_CREAT | os.O_WRONLY | os.O_TRUNC, 0o600)
+        fd = os.open(tmp_path, os.O_CREAT | os.O_WRONLY | os.O_TRUNC, 0o600)
         with os.fdopen(fd, "w") as f:
             f.write(agent_id)
-            f.flush()
-            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
     except OSError:
-        pass  # Best effort
+        # Best effort
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
 
 
 def delete_agent_id_file(session_id: str) -> None:
@@ -233,13 +357,27 @@ def delete_agent_id_file(session_id: str) -> None:
 
 
 def parse_hook_input() -> dict:
-    """Read and parse JSON from stdin. Returns {} on failure."""
+    """Read and parse JSON from stdin. Returns {} on failure.
+
+    Parses the raw bytes from stdin.buffer, skipping the text-mode decoding
+    layer; json.loads detects the UTF encoding itself.
+    """
     try:
-        return json.load(sys.stdin)
-    except (json.JSONDecodeError, EOFError, ValueError):
+        return json.loads(sys.stdin.buffer.read())
+    except ValueError:
         return {}
 
 
+def write_hook_output(data: dict) -> None:
+    """Write a hook's JSON decision to stdout as a single line.
+
+    Writes encoded bytes straight to stdout.buffer rather than going
+    through print() and the text-mode layer.
+    """
+    sys.stdout.buffer.write(json.dumps(data).encode() + b"\n")
+    sys.stdout.buffer.flush()
+
+
 def get_session_id(stdin_data: dict) -> str:
     """Extract session_id from parsed hook stdin.
 
@@ -17,15 +17,14 @@ Environment variables:
 import json
 import os
 import sys
-import urllib.request
-import urllib.error
 from pathlib import Path
 
-from c3po_common import auth_headers, get_coordinator_url, get_session_id, read_agent_id, urlopen_with_ssl
+from c3po_common import auth_headers, get_coordinator_url, get_session_id, is_urgent, keepalive_request, read_agent_id, truncate, write_hook_output
 
 
 # Configuration
 COORDINATOR_URL = get_coordinator_url()
+AUTH_HEADERS = auth_headers()
 TMPDIR = os.environ.get("TMPDIR", "/tmp")
 
 
@@ -49,23 +48,41 @@ def _write_blocked_ids(session_id: str, message_ids: list[str]) -> None:
         pass  # Best effort
 
 
+def _format_preview(msg_data: dict) -> str:
+    """Format one pending message as a summary line for the block reason."""
+    from_agent = msg_data.get("from_agent", "unknown")
+    full_message = msg_data.get("message", "")
+    context = msg_data.get("context", "")
+
+    urgent = is_urgent(msg_data)
+    urgency_marker = "🔴 URGENT: " if urgent else ""
+
+    # Show more preview for urgent messages (200 chars vs 150)
+    message_preview = truncate(full_message, 200 if urgent else 150)
+
+    # Include context preview if available
+    context_preview = f" (context: {truncate(context, 50)})" if context else ""
+
+    return f"  - {urgency_marker}From {from_agent}: {message_preview}{context_preview}"
+
+
 def _heartbeat(assigned_id: str) -> None:
-    """Ping the coordinator to refresh last_seen for this agent.
+    """Refresh last_seen with a separate register call.
 
-    The Stop hook is the most reliable periodic signal we get from
-    Claude Code (fires every turn), so we use it as a heartbeat to
-    keep the agent marked as online.
+    Fallback for when the pending check didn't refresh it: the request
+    failed, or the coordinator predates the heartbeat=1 parameter (it then
+    omits "heartbeat" from the response). Sent over the same keep-alive
+    connection as the pending check.
     """
     try:
         headers = {"X-Machine-Name": assigned_id}
-        headers.update(auth_headers())
-        req = urllib.request.Request(
+        headers.update(AUTH_HEADERS)
+        keepalive_request(
+            "POST",
             f"{COORDINATOR_URL}/agent/api/register",
-            data=b"",
             headers=headers,
-            method="POST",
+            body=b"",
         )
-        urlopen_with_ssl(req, timeout=5)
     except Exception:
         pass  # Best effort - don't block stop
 
@@ -73,8 +90,8 @@ def _heartbeat(assigned_id: str) -> None:
 def main() -> None:
     # Read hook input from stdin FIRST to get session_id
     try:
-        stdin_data = json.load(sys.stdin)
-    except json.JSONDecodeError:
+        stdin_data = json.loads(sys.stdin.buffer.read())
+    except (json.JSONDecodeError, UnicodeDecodeError):
         # Can't parse input, fail open
         sys.exit(0)
 
@@ -88,14 +105,8 @@ def main() -> None:
     # Read agent ID using session_id
     assigned_id = read_agent_id(session_id)
 
-    # Refresh last_seen so the agent stays marked as online
-    if assigned_id:
-        _heartbeat(assigned_id)
-    else:
-        print("[c3po] Warning: no agent ID file found, skipping heartbeat", file=sys.stderr)
-
     if not assigned_id:
-        print("[c3po] Warning: no agent ID file found, skipping pending check", file=sys.stderr)
+        print("[c3po] Warning: no agent ID file found, skipping heartbeat and pending check", file=sys.stderr)
         sys.exit(0)
 
     # Whether this is a second stop attempt (after a block). We still check
@@ -104,50 +115,34 @@ def main() -> None:
     stop_hook_active = stdin_data.get("stop_hook_active", False)
 
     try:
+        # Deferred so the no-agent-ID exit above skips this import
+        import http.client
+
         pending_headers = {"X-Machine-Name": assigned_id}
-        pending_headers.update(auth_headers())
-        req = urllib.request.Request(
-            f"{COORDINATOR_URL}/agent/api/pending",
+        pending_headers.update(AUTH_HEADERS)
+        # heartbeat=1 also refreshes last_seen so the agent stays marked as
+        # online. The Stop hook is the most reliable periodic signal we get
+        # from Claude Code (fires every turn), so it doubles as a heartbeat.
+        status, body = keepalive_request(
+            "GET",
+            f"{COORDINATOR_URL}/agent/api/pending?heartbeat=1",
             headers=pending_headers,
         )
-        with urlopen_with_ssl(req, timeout=5) as resp:
-            data = json.loads(resp.read())
+        if status != 200:
+            # Auth or server error - fail open, but still try to stay online
+            _heartbeat(assigned_id)
+            sys.exit(0)
+        data = json.loads(body)
+        if "heartbeat" not in data:
+            _heartbeat(assigned_id)
 
         count = data.get("count", 0)
         if count > 0:
             # Format the pending messages for Claude with richer previews
             messages = data.get("messages", [])
-            message_summary = []
-            urgent_keywords = ["urgent", "interrupt", "cancel", "asap", "emergency", "critical"]
-
-            for msg_data in messages[:3]:  # Show first 3
-                from_agent = msg_data.get("from_agent", "unknown")
-                full_message = msg_data.get("message", "")
-                context = msg_data.get("context", "")
-
-                # Check for urgency keywords
-                is_urgent = any(kw in full_message.lower() for kw in urgent_keywords)
-                urgency_marker = "🔴 URGENT: " if is_urgent else ""
-
-                # Show more preview for urgent messages (200 chars vs 150)
-                preview_len = 200 if is_urgent else 150
-                message_preview = full_message[:preview_len]
-                if len(full_message) > preview_len:
-                    message_preview += "..."
-
-                # Include context preview if available
-                context_preview = ""
-                if context:
-                    context_preview = f" (context: {context[:50]}{'...' if len(context) > 50 else ''})"
-
-                message_summary.append(
-                    f"  - {urgency_marker}From {from_agent}: {message_preview}{context_preview}"
-                )
-
+            summary = "\n".join(_format_preview(m) for m in messages[:3])  # Show first 3
             if count > 3:
-                message_summary.append(f"  ... and {count - 3} more")
-
-            summary = "\n".join(message_summary)
+                summary += f"\n  ... and {count - 3} more"
 
             current_ids = [m.get("id") for m in messages]
             block_reason = (
@@ -171,17 +166,13 @@ def main() -> None:
                 else:
                     # New messages arrived since last block — block again
                     _write_blocked_ids(session_id, current_ids)
-                    output = {"decision": "block", "reason": block_reason}
-                    print(json.dumps(output))
+                    write_hook_output({"decision": "block", "reason": block_reason})
             else:
                 # First stop attempt — block until messages are processed.
                 _write_blocked_ids(session_id, current_ids)
-                output = {"decision": "block", "reason": block_reason}
-                print(json.dumps(output))
+                write_hook_output({"decision": "block", "reason": block_reason})
 
-    except urllib.error.URLError:
-        pass
-    except urllib.error.HTTPError:
+    except (OSError, http.client.HTTPException):
         pass
     except json.JSONDecodeError:
         pass
@@ -11,6 +11,10 @@ keyed by the session_id provided in stdin.
 
 Exit codes:
 - 0: Always (with JSON output to inject agent_id or allow)
+
+Environment variables:
+- C3PO_DEBUG: If set, log each decision to $TMPDIR/c3po-ensure-agent-id.log
+  and stderr
 """
 
 import json
@@ -18,34 +22,48 @@ import os
 import sys
 import time
 
-from c3po_common import get_agent_id_file, get_session_id, read_agent_id
+from c3po_common import get_agent_id_file, get_session_id, read_agent_id, write_hook_output
 
 # Tool name prefix for the OAuth (Claude.ai) MCP connection — hooks don't work here.
 OAUTH_TOOL_PREFIX = "mcp__claude_ai_c3po__"
+_OAUTH_REJECT_TEMPLATE = (
+    "You're using the Claude.ai OAuth MCP connection (mcp__claude_ai_c3po__*), "
+    "which bypasses C3PO's hooks. "
+    "Use the direct connection instead: mcp__c3po__%s "
+    "(if that tool isn't available, run /c3po setup to register the direct connection). "
+    "Also disable the C3PO OAuth MCP connector in your Claude.ai account settings "
+    "(Settings → Integrations) to avoid this conflict."
+)
 
 
-def _load_tools_needing_agent_id() -> set:
+def _load_tools_needing_agent_id() -> frozenset:
     tools_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".claude-plugin", "tools.json")
     with open(tools_path) as f:
         tools = json.load(f)["tools"]
-    return {f"mcp__c3po__{t['name']}" for t in tools if t["needs_agent_id"]}
+    return frozenset(f"mcp__c3po__{t['name']}" for t in tools if t["needs_agent_id"])
+
 
+# How long to wait for the SessionStart hook to write the agent ID file, and how
+# often to check for it while waiting.
+AGENT_ID_WAIT_TIMEOUT = 3.0
+AGENT_ID_POLL_INTERVAL = 0.05
 
 # Tools that need agent_id injection — loaded from .claude-plugin/tools.json.
 TOOLS_NEEDING_AGENT_ID = _load_tools_needing_agent_id()
 
 
-def _debug(msg: str) -> None:
-    """Write debug info to stderr (visible in Claude Code debug logs)."""
-    if os.environ.get("C3PO_DEBUG"):
-        print(f"[c3po:ensure_agent_id] {msg}", file=sys.stderr)
-
-
+# Diagnostics logging runs on every tool call, so it is off unless asked for
+DEBUG = bool(os.environ.get("C3PO_DEBUG"))
 LOG_FILE = os.path.join(os.environ.get("TMPDIR", "/tmp"), "c3po-ensure-agent-id.log")
 
 
 def _log(msg: str) -> None:
-    """Append to log file for diagnostics (survives across invocations)."""
+    """Append to log file for diagnostics when C3PO_DEBUG is set.
+
+    The file survives across invocations; lines are echoed to stderr too.
+    """
+    if not DEBUG:
+        return
     try:
         with open(LOG_FILE, "a") as f:
             f.write(f"{msg}\n")
@@ -65,8 +83,8 @@ def _deny(explanation: str) -> None:
 
 def main() -> None:
     try:
-        stdin_data = json.load(sys.stdin)
-    except (json.JSONDecodeError, EOFError) as e:
+        stdin_data = json.loads(sys.stdin.buffer.read())
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
         _log(f"STDIN PARSE FAILED: {type(e).__name__}: {e}")
         _deny(f"Hook stdin parse failed: {type(e).__name__}")
 
@@ -77,15 +95,7 @@ def main() -> None:
     # there (agent_id injection is skipped), and it bypasses the direct API key path.
     # See: https://github.com/anthropics/claude-code/issues/20412
     if tool_name.startswith(OAUTH_TOOL_PREFIX):
-        base_tool = tool_name[len(OAUTH_TOOL_PREFIX):]
-        msg = (
-            f"You're using the Claude.ai OAuth MCP connection (mcp__claude_ai_c3po__*), "
-            f"which bypasses C3PO's hooks. "
-            f"Use the direct connection instead: mcp__c3po__{base_tool} "
-            f"(if that tool isn't available, run /c3po setup to register the direct connection). "
-            f"Also disable the C3PO OAuth MCP connector in your Claude.ai account settings "
-            f"(Settings → Integrations) to avoid this conflict."
-        )
+        msg = _OAUTH_REJECT_TEMPLATE % tool_name[len(OAUTH_TOOL_PREFIX):]
         _log(f"OAUTH REJECTED: {tool_name} — {msg}")
         _deny(msg)
 
@@ -114,15 +124,23 @@ def main() -> None:
 
     # Read the assigned agent_id from the session file (retry to handle race with SessionStart hook)
     path = get_agent_id_file(session_id)
-    agent_id = None
-    for attempt in range(5):
+    # Poll at a short fixed interval up to a deadline rather than backing off,
+    # so a file written mid-wait is picked up within one interval.
+    deadline = time.monotonic() + AGENT_ID_WAIT_TIMEOUT
+    attempt = 0
+    while True:
+        attempt += 1
         agent_id = read_agent_id(session_id)
         if agent_id:
-            if attempt > 0:
-                _log(f"LOOKUP: found agent_id on attempt {attempt + 1}")
+            if attempt > 1:
+                _log(f"LOOKUP: found agent_id on attempt {attempt}")
+            break
+        if time.monotonic() >= deadline:
             break
-        time.sleep(0.1 * (2 ** attempt))  # 0.1, 0.2, 0.4, 0.8, 1.6s = ~3s total
-    _log(f"LOOKUP: session_id={session_id} path={path} exists={os.path.exists(path)} agent_id={agent_id!r}")
+        time.sleep(AGENT_ID_POLL_INTERVAL)
+    # A successful read already proves the file exists; only stat it on failure
+    exists = True if agent_id else os.path.exists(path)
+    _log(f"LOOKUP: session_id={session_id} path={path} exists={exists} agent_id={agent_id!r}")
 
     if not agent_id:
         msg = (
@@ -144,9 +162,9 @@ def main() -> None:
             "updatedInput": updated_input,
         }
     }
-    output = json.dumps(result)
-    _log(f"INJECTING: agent_id={agent_id} into {tool_name}. output={output[:200]}")
-    print(output)
+    if DEBUG:
+        _log(f"INJECTING: agent_id={agent_id} into {tool_name}. output={json.dumps(result)[:200]}")
+    write_hook_output(result)
     sys.exit(0)
 
 
@@ -25,11 +25,9 @@ import json
 import os
 import sys
 import time
-import urllib.request
-import urllib.error
 from pathlib import Path
 
-from c3po_common import auth_headers, get_coordinator_url, get_session_id, read_agent_id, urlopen_with_ssl
+from c3po_common import auth_headers, get_coordinator_url, get_session_id, is_urgent, keepalive_request, read_agent_id, truncate, write_hook_output
 
 
 # Configuration
@@ -54,7 +52,7 @@ def _log(msg: str) -> None:
 
 def _get_rate_limit_file(session_id: str) -> Path:
     """Get path to rate-limit tracking file for this session."""
-    return Path(TMPDIR) / f"c3po-peek-{session_id}.json"
+    return Path(TMPDIR) / f"c3po-peek-{session_id}.state"
 
 
 def _should_inject(session_id: str, message_ids: list[str]) -> bool:
@@ -69,34 +67,33 @@ def _should_inject(session_id: str, message_ids: list[str]) -> bool:
     """
     rate_file = _get_rate_limit_file(session_id)
 
-    if not rate_file.exists():
+    # The state file is only written on injection, so its mtime is the time
+    # of the last injection. Once the window has passed, skip reading it.
+    try:
+        elapsed = time.time() - os.stat(rate_file).st_mtime
+    except OSError:
+        return True
+    if elapsed >= RATE_LIMIT_SECONDS:
+        _log(f"INJECT: rate limit elapsed ({elapsed:.0f}s >= {RATE_LIMIT_SECONDS}s)")
         return True
 
     try:
         with open(rate_file) as f:
-            state = json.load(f)
-
-        last_injection = state.get("last_injection", 0)
-        last_message_ids = set(state.get("message_ids", []))
-        current_message_ids = set(message_ids)
+            last_message_ids = f.read().splitlines()
+    except OSError:
+        return True
 
-        # If there are new messages not seen before, inject regardless of rate limit
-        new_messages = current_message_ids - last_message_ids
+    # If there are new messages not seen before, inject regardless of rate limit.
+    # The inbox usually comes back exactly as last injected, so compare the
+    # lists first and only fall back to a set difference when they differ.
+    if message_ids != last_message_ids:
+        new_messages = set(message_ids).difference(last_message_ids)
         if new_messages:
             _log(f"INJECT: {len(new_messages)} new message(s) — bypassing rate limit")
             return True
 
-        # Otherwise, respect rate limit for same messages
-        elapsed = time.time() - last_injection
-        if elapsed >= RATE_LIMIT_SECONDS:
-            _log(f"INJECT: rate limit elapsed ({elapsed:.0f}s >= {RATE_LIMIT_SECONDS}s)")
-            return True
-
-        _log(f"SKIP: rate-limited, same messages, {elapsed:.0f}s < {RATE_LIMIT_SECONDS}s")
-        return False
-
-    except (json.JSONDecodeError, IOError):
-        return True
+    _log(f"SKIP: rate-limited, same messages, {elapsed:.0f}s < {RATE_LIMIT_SECONDS}s")
+    return False
 
 
 def _update_rate_limit_state(session_id: str, message_ids: list[str]) -> None:
@@ -108,22 +105,27 @@ def _update_rate_limit_state(session_id: str, message_ids: list[str]) -> None:
     """
     rate_file = _get_rate_limit_file(session_id)
 
+    # Write to a temp file and rename it into place, so a hook killed
+    # mid-write can't leave a truncated ID list that triggers re-injection
+    tmp_file = rate_file.with_name(f"{rate_file.name}.{os.getpid()}.tmp")
     try:
-        state = {
-            "last_injection": time.time(),
-            "message_ids": message_ids,
-        }
-        with open(rate_file, "w") as f:
-            json.dump(state, f)
+        # One message ID per line; the file's mtime records the injection time
+        with open(tmp_file, "w") as f:
+            f.write("\n".join(message_ids))
+        os.replace(tmp_file, rate_file)
     except IOError:
-        pass  # Best effort - don't fail the hook
+        # Best effort - don't fail the hook
+        try:
+            os.unlink(tmp_file)
+        except OSError:
+            pass
 
 
 def main() -> None:
     # Read hook input from stdin
     try:
-        stdin_data = json.load(sys.stdin)
-    except json.JSONDecodeError:
+        stdin_data = json.loads(sys.stdin.buffer.read())
+    except (json.JSONDecodeError, UnicodeDecodeError):
         # Can't parse input, exit silently
         sys.exit(0)
 
@@ -148,21 +150,32 @@ def main() -> None:
 
     # Check for pending messages via REST API
     try:
+        # Imported here (~tens of ms with its email.* dependencies) so the
+        # early exits above never pay for it
+        import http.client
+
         pending_headers = {"X-Machine-Name": assigned_id}
         pending_headers.update(auth_headers())
-        req = urllib.request.Request(
+        status, body = keepalive_request(
+            "GET",
             f"{COORDINATOR_URL}/agent/api/pending",
             headers=pending_headers,
+            timeout=1,
+            connect_timeout=0.5,
         )
-        with urlopen_with_ssl(req, timeout=1) as resp:
-            data = json.loads(resp.read())
+        if status != 200:
+            _log(f"SKIP: coordinator HTTP error {status}")
+            sys.exit(0)
+        data = json.loads(body)
 
         messages = data.get("messages", [])
         _log(f"PENDING: {len(messages)} message(s)")
         if not messages:
             sys.exit(0)
 
-        message_ids = [msg.get("id") for msg in messages]
+        # Messages without an id can't be tracked for novelty; the time-based
+        # rate limit still covers them
+        message_ids = [str(msg["id"]) for msg in messages if msg.get("id")]
 
         # Check rate limit / novelty
         if not _should_inject(session_id, message_ids):
@@ -171,34 +184,25 @@ def main() -> None:
 
         # Format message summary for systemMessage
         count = len(messages)
-        urgent_keywords = ["urgent", "interrupt", "cancel", "asap", "emergency", "critical"]
-
-        # Prioritize urgent messages in summary
-        urgent_messages = [
-            msg for msg in messages
-            if any(kw in msg.get("message", "").lower() for kw in urgent_keywords)
-        ]
-        normal_messages = [
-            msg for msg in messages
-            if msg not in urgent_messages
-        ]
 
-        summary_lines = []
+        # Prioritize urgent messages in summary (one pass, no list membership tests)
+        urgent_messages = []
+        normal_messages = []
+        for msg in messages:
+            if is_urgent(msg):
+                urgent_messages.append(msg)
+            else:
+                normal_messages.append(msg)
 
-        # Show urgent messages first
+        # Show urgent messages first, then normal messages
+        summary_lines = []
         for msg in urgent_messages[:2]:
             from_agent = msg.get("from_agent", "unknown")
-            preview = msg.get("message", "")[:100]
-            if len(msg.get("message", "")) > 100:
-                preview += "..."
+            preview = truncate(msg.get("message", ""), 100)
             summary_lines.append(f"  🔴 URGENT from {from_agent}: {preview}")
-
-        # Then normal messages
         for msg in normal_messages[:2]:
             from_agent = msg.get("from_agent", "unknown")
-            preview = msg.get("message", "")[:100]
-            if len(msg.get("message", "")) > 100:
-                preview += "..."
+            preview = truncate(msg.get("message", ""), 100)
             summary_lines.append(f"  - From {from_agent}: {preview}")
 
         remaining = count - len(summary_lines)
@@ -218,16 +222,14 @@ def main() -> None:
                 ),
             }
         }
-        print(json.dumps(output))
+        write_hook_output(output)
         _log(f"INJECTED: additionalContext for {count} message(s)")
 
         # Update rate-limit state after injection.
         _update_rate_limit_state(session_id, message_ids)
 
-    except urllib.error.URLError:
-        _log("SKIP: coordinator unreachable (URLError)")
-    except urllib.error.HTTPError as e:
-        _log(f"SKIP: coordinator HTTP error {e.code}")
+    except (OSError, http.client.HTTPException) as e:
+        _log(f"SKIP: coordinator unreachable ({type(e).__name__})")
     except json.JSONDecodeError:
         _log("SKIP: JSON decode error from coordinator")
     except Exception as e:
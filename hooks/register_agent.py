@@ -17,6 +17,7 @@ Environment variables:
 
 from __future__ import annotations
 
+import functools
 import json
 import os
 import sys
@@ -29,18 +30,32 @@ from c3po_common import auth_headers, get_coordinator_url, get_machine_name, get
 
 # Configuration
 COORDINATOR_URL = get_coordinator_url()
-MACHINE_NAME = get_machine_name()
+DEBUG = bool(os.environ.get("C3PO_DEBUG"))
 
-# Project context from Gas Town environment variables
-# Format: gt-{rig}-{role}-{crew} (e.g., gt-c3po-crew-michaelansel)
-# Fallback to CLAUDE_PROJECT_NAME or basename(cwd) if GT_RIG not set
-gt_rig = os.environ.get("GT_RIG", "")
-gt_role = os.environ.get("GT_ROLE", "")
-gt_crew = os.environ.get("GT_CREW", "")
 
-if gt_role:
+@functools.lru_cache(maxsize=1)
+def _project_name() -> str:
+    """Build this session's project name from the environment.
+
+    Computed on first use rather than at import, so the no-session_id exit
+    path in main() skips it.
+
+    Project context comes from Gas Town environment variables, format
+    gt-{rig}-{role}-{crew} (e.g., gt-c3po-crew-michaelansel), with a fallback
+    to CLAUDE_PROJECT_NAME or basename(cwd) if GT_ROLE is not set.
+    """
+    gt_rig = os.environ.get("GT_RIG", "")
+    gt_role = os.environ.get("GT_ROLE", "")
+    gt_crew = os.environ.get("GT_CREW", "")
+
+    if not gt_role:
+        # Fallback: use legacy behavior
+        return sanitize_name(
+            os.environ.get("CLAUDE_PROJECT_NAME") or os.path.basename(os.getcwd())
+        )
+
     # Log all GT_* environment variables for future analysis
-    if os.environ.get("C3PO_DEBUG"):
+    if DEBUG:
         gt_env_vars = {k: v for k, v in os.environ.items() if k.startswith("GT_")}
         print(f"[c3po:debug] GT environment variables: {gt_env_vars}", file=sys.stderr)
 
@@ -52,37 +67,19 @@ if gt_role:
         # Remove "gt-" prefix from rig if present to avoid double prefix
         clean_rig = gt_rig.replace("gt-", "", 1) if gt_rig.startswith("gt-") else gt_rig
         # If clean_rig is empty (GT_RIG was not set), we don't want to include it
-        if clean_rig:
-            components = [clean_rig, gt_role]
-        else:
-            components = [gt_role]
-        PROJECT_NAME = sanitize_name("gt-" + "-".join(components))
-        # Log for future enhancement analysis
-        if os.environ.get("C3PO_DEBUG"):
-            if clean_rig:
-                print(f"[c3po:debug] Special role handling: {gt_role} -> gt-{clean_rig}-{gt_role}", file=sys.stderr)
-            else:
-                print(f"[c3po:debug] Special role handling: {gt_role} -> gt-{gt_role}", file=sys.stderr)
+        components = [clean_rig, gt_role] if clean_rig else [gt_role]
+        label = "Special"
     else:
         # Standard crew pattern: gt-{rig}-{role}-{crew}
         # Build components properly, filtering out empty values
-        components = []
-        if gt_rig:
-            components.append(gt_rig)
-        components.append(gt_role)
-        if gt_crew:  # Only add crew if it's not empty
-            components.append(gt_crew)
-        PROJECT_NAME = sanitize_name("gt-" + "-".join(components))
-        if os.environ.get("C3PO_DEBUG"):
-            if gt_rig:
-                print(f"[c3po:debug] Standard role handling: {gt_role} -> gt-{gt_rig}-{gt_role}{('-' + gt_crew) if gt_crew else ''}", file=sys.stderr)
-            else:
-                print(f"[c3po:debug] Standard role handling: {gt_role} -> gt-{gt_role}{('-' + gt_crew) if gt_crew else ''}", file=sys.stderr)
-else:
-    # Fallback: use legacy behavior
-    PROJECT_NAME = sanitize_name(
-        os.environ.get("CLAUDE_PROJECT_NAME") or os.path.basename(os.getcwd())
-    )
+        components = [c for c in (gt_rig, gt_role, gt_crew) if c]
+        label = "Standard"
+
+    joined = "gt-" + "-".join(components)
+    # Log for future enhancement analysis
+    if DEBUG:
+        print(f"[c3po:debug] {label} role handling: {gt_role} -> {joined}", file=sys.stderr)
+    return sanitize_name(joined)
 
 
 def register_with_coordinator(session_id: str) -> dict | None:
@@ -96,13 +93,15 @@ def register_with_coordinator(session_id: str) -> dict | None:
     Returns:
         Registration result dict (with assigned agent_id) or None if failed
     """
-    attempted_agent_id = f"{MACHINE_NAME}/{PROJECT_NAME}"
-    if os.environ.get("C3PO_DEBUG"):
+    machine_name = get_machine_name()
+    project_name = _project_name()
+    attempted_agent_id = f"{machine_name}/{project_name}"
+    if DEBUG:
         print(f"[c3po:debug] Attempting to register agent: {attempted_agent_id}", file=sys.stderr)
 
     headers = {
-        "X-Machine-Name": MACHINE_NAME,
-        "X-Project-Name": PROJECT_NAME,
+        "X-Machine-Name": machine_name,
+        "X-Project-Name": project_name,
         "X-Session-ID": session_id,
     }
     headers.update(auth_headers())
@@ -120,17 +119,17 @@ def register_with_coordinator(session_id: str) -> dict | None:
         try:
             with urlopen_with_ssl(req, timeout=15) as resp:
                 result = json.loads(resp.read())
-                if os.environ.get("C3PO_DEBUG"):
+                if DEBUG:
                     print(f"[c3po:debug] Registration successful: {result}", file=sys.stderr)
                 return result
         except urllib.error.HTTPError as e:
             print(f"[c3po:debug] HTTPError registering {attempted_agent_id}: {e.code}", file=sys.stderr)
             if e.code == 429 and attempt < max_retries:
-                if os.environ.get("C3PO_DEBUG"):
+                if DEBUG:
                     print(f"[c3po:debug] Rate limited (attempt {attempt + 1}), retrying in {retry_delay}s...", file=sys.stderr)
                 time.sleep(retry_delay)
                 continue
-            if os.environ.get("C3PO_DEBUG"):
+            if DEBUG:
                 try:
                     error_body = e.read().decode()
                     print(f"[c3po:debug] Response body: {error_body}", file=sys.stderr)
@@ -138,11 +137,11 @@ def register_with_coordinator(session_id: str) -> dict | None:
                     pass
             break
         except urllib.error.URLError as e:
-            if os.environ.get("C3PO_DEBUG"):
+            if DEBUG:
                 print(f"[c3po:debug] URLError registering {attempted_agent_id}: {e.reason}", file=sys.stderr)
             break
         except Exception as e:
-            if os.environ.get("C3PO_DEBUG"):
+            if DEBUG:
                 print(f"[c3po:debug] Exception registering {attempted_agent_id}: {type(e).__name__}: {e}", file=sys.stderr)
             break
 
@@ -165,7 +164,7 @@ def main() -> None:
 
         if registration:
             # The coordinator returns the assigned agent_id (may have collision suffix)
-            assigned_id = registration.get("id", f"{MACHINE_NAME}/{PROJECT_NAME}")
+            assigned_id = registration.get("id") or f"{get_machine_name()}/{_project_name()}"
 
             # Save assigned agent_id keyed by session_id for other hooks to read
             save_agent_id(session_id, assigned_id)
@@ -180,14 +179,17 @@ def main() -> None:
                 except OSError:
                     pass  # Best effort
 
-            # Get agent count from health endpoint (no auth required for health)
-            req = urllib.request.Request(
-                f"{COORDINATOR_URL}/api/health",
-            )
-            with urlopen_with_ssl(req, timeout=5) as resp:
-                health = json.loads(resp.read())
-
-            agents_online = health.get("agents_online", 0)
+            # The register response carries the online count; older
+            # coordinators don't, so fall back to the health endpoint
+            # (no auth required for health)
+            agents_online = registration.get("agents_online")
+            if agents_online is None:
+                req = urllib.request.Request(
+                    f"{COORDINATOR_URL}/api/health",
+                )
+                with urlopen_with_ssl(req, timeout=5) as resp:
+                    health = json.loads(resp.read())
+                agents_online = health.get("agents_online", 0)
 
             # Output context for Claude
             print(f"[c3po] Connected to coordinator at {COORDINATOR_URL}")
@@ -200,22 +202,22 @@ def main() -> None:
 
     except urllib.error.URLError as e:
         print(f"[c3po] Coordinator not available at {COORDINATOR_URL}")
-        if os.environ.get("C3PO_DEBUG"):
+        if DEBUG:
             print(f"[c3po:debug] URLError: {e.reason}", file=sys.stderr)
         print(f"[c3po] Running in local mode.")
     except urllib.error.HTTPError as e:
         print(f"[c3po] Coordinator error ({e.code}) at {COORDINATOR_URL}")
-        if os.environ.get("C3PO_DEBUG"):
+        if DEBUG:
             print(f"[c3po:debug] HTTPError: {e.read().decode()}", file=sys.stderr)
         print(f"[c3po] Running in local mode.")
     except json.JSONDecodeError as e:
         print(f"[c3po] Invalid coordinator response from {COORDINATOR_URL}")
-        if os.environ.get("C3PO_DEBUG"):
+        if DEBUG:
             print(f"[c3po:debug] JSONDecodeError: {e}", file=sys.stderr)
         print(f"[c3po] Running in local mode.")
     except Exception as e:
         print(f"[c3po] Coordinator check failed for {COORDINATOR_URL}")
-        if os.environ.get("C3PO_DEBUG"):
+        if DEBUG:
             print(f"[c3po:debug] Exception: {type(e).__name__}: {e}", file=sys.stderr)
         print(f"[c3po] Running in local mode.")
 
@@ -5,6 +5,8 @@ import os
 import platform
 import re
 import sys
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
 
 import pytest
 
@@ -18,8 +20,11 @@ from c3po_common import (
     get_machine_name,
     get_coordinator_url,
     get_session_id,
+    is_urgent,
+    keepalive_request,
     read_agent_id,
     sanitize_name,
+    truncate,
     save_agent_id,
     save_credentials,
     delete_agent_id_file,
@@ -62,6 +67,15 @@ class TestSaveAndReadAgentId:
         assert read_agent_id("sess-a") == "machine/proj-a"
         assert read_agent_id("sess-b") == "machine/proj-b"
 
+    def test_save_replaces_existing_file_with_restricted_permissions(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("TMPDIR", str(tmp_path))
+        monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+        save_agent_id("sess-1", "machine/old")
+        save_agent_id("sess-1", "machine/new")
+        assert read_agent_id("sess-1") == "machine/new"
+        assert os.listdir(tmp_path) == ["c3po-agent-id-sess-1"]
+        assert os.stat(tmp_path / "c3po-agent-id-sess-1").st_mode & 0o777 == 0o600
+
 
 class TestDeleteAgentIdFile:
     def test_deletes_existing_file(self, tmp_path, monkeypatch):
@@ -116,6 +130,28 @@ class TestGetCoordinatorUrl:
         monkeypatch.setenv("HOME", str(tmp_path))  # No .claude.json
         assert get_coordinator_url() == "http://localhost:8420"
 
+    def test_claude_json_parsed_once_for_url_and_machine_name(self, tmp_path, monkeypatch):
+        monkeypatch.delenv("C3PO_COORDINATOR_URL", raising=False)
+        monkeypatch.delenv("C3PO_MACHINE_NAME", raising=False)
+        import c3po_common
+        monkeypatch.setattr(c3po_common, "CREDENTIALS_FILE", str(tmp_path / "nonexistent"))
+        (tmp_path / ".claude.json").write_text(json.dumps({
+            "mcpServers": {
+                "c3po": {
+                    "url": "http://myhost:8420/agent/mcp",
+                    "headers": {"X-Machine-Name": "laptop"},
+                }
+            }
+        }))
+        monkeypatch.setenv("HOME", str(tmp_path))
+        loads = []
+        real_load = json.load
+        monkeypatch.setattr(c3po_common.json, "load", lambda f: loads.append(f.name) or real_load(f))
+
+        assert get_coordinator_url() == "http://myhost:8420"
+        assert get_machine_name() == "laptop"
+        assert loads.count(str(tmp_path / ".claude.json")) == 1
+
 
 class TestGetMachineName:
     def test_env_c3po_machine_name_takes_priority(self, monkeypatch):
@@ -220,6 +256,25 @@ class TestGetCredentials:
         assert get_credentials() == {}
 
 
+    def test_parses_file_once_per_process(self, tmp_path, monkeypatch):
+        creds_file = tmp_path / "creds.json"
+        creds_file.write_text(json.dumps({"api_token": "first"}))
+        import c3po_common
+        monkeypatch.setattr(c3po_common, "CREDENTIALS_FILE", str(creds_file))
+        assert get_credentials() == {"api_token": "first"}
+
+        creds_file.write_text(json.dumps({"api_token": "second"}))
+        assert get_credentials() == {"api_token": "first"}
+
+    def test_returns_copy_of_cached_credentials(self, tmp_path, monkeypatch):
+        creds_file = tmp_path / "creds.json"
+        creds_file.write_text(json.dumps({"api_token": "tok"}))
+        import c3po_common
+        monkeypatch.setattr(c3po_common, "CREDENTIALS_FILE", str(creds_file))
+        get_credentials()["api_token"] = "mutated"
+        assert get_credentials() == {"api_token": "tok"}
+
+
 class TestSaveCredentials:
     def test_saves_and_reads_back(self, tmp_path, monkeypatch):
         creds_file = tmp_path / ".claude" / "c3po-credentials.json"
@@ -294,6 +349,87 @@ class TestAuthHeaders:
         assert headers == {"Authorization": "Bearer new-token"}
 
 
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    """Echo handler that records the client port of each request."""
+
+    protocol_version = "HTTP/1.1"
+    client_ports: list = []
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.client_ports.append(self.client_address[1])
+        status = 404 if self.path == "/missing" else 200
+        body = self.path.encode()
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        if self.path == "/drop":
+            # Close without a Connection: close header, as an idle timeout would
+            self.close_connection = True
+
+
+@pytest.fixture
+def keepalive_server(monkeypatch):
+    """Start an HTTP/1.1 server and isolate keepalive_request's connection cache."""
+    import c3po_common
+    monkeypatch.setattr(c3po_common, "_CONNECTIONS", {})
+    _KeepAliveHandler.client_ports = []
+
+    server = HTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+
+    for conn in c3po_common._CONNECTIONS.values():
+        conn.close()
+    server.shutdown()
+
+
+class TestKeepaliveRequest:
+    def test_returns_status_and_body(self, keepalive_server):
+        assert keepalive_request("GET", f"{keepalive_server}/a?x=1") == (200, b"/a?x=1")
+
+    def test_returns_error_status_without_raising(self, keepalive_server):
+        status, _ = keepalive_request("GET", f"{keepalive_server}/missing")
+        assert status == 404
+
+    def test_reuses_connection_across_requests(self, keepalive_server):
+        keepalive_request("GET", f"{keepalive_server}/one")
+        keepalive_request("GET", f"{keepalive_server}/two")
+        ports = _KeepAliveHandler.client_ports
+        assert len(ports) == 2
+        assert ports[0] == ports[1]
+
+    def test_reconnects_after_server_closes_connection(self, keepalive_server):
+        keepalive_request("GET", f"{keepalive_server}/drop")
+        assert keepalive_request("GET", f"{keepalive_server}/two") == (200, b"/two")
+        ports = _KeepAliveHandler.client_ports
+        assert ports[0] != ports[1]
+
+    def test_connect_timeout_does_not_shorten_read_timeout(self, keepalive_server):
+        import c3po_common
+        keepalive_request("GET", f"{keepalive_server}/a", timeout=4, connect_timeout=0.5)
+        (conn,) = c3po_common._CONNECTIONS.values()
+        assert conn.sock.gettimeout() == 4
+
+    def test_connect_timeout_error_propagates(self, monkeypatch):
+        import http.client
+        import c3po_common
+        monkeypatch.setattr(c3po_common, "_CONNECTIONS", {})
+
+        def fail_connect(self):
+            raise TimeoutError("timed out")
+
+        monkeypatch.setattr(http.client.HTTPConnection, "connect", fail_connect)
+        with pytest.raises(TimeoutError):
+            keepalive_request("GET", "http://127.0.0.1:9/a", connect_timeout=0.1)
+        assert c3po_common._CONNECTIONS == {}
+
+
 class TestSanitizeName:
     """Tests for the sanitize_name function."""
 
@@ -313,6 +449,10 @@ class TestSanitizeName:
         assert sanitize_name("my@@project") == "my-project"
         assert sanitize_name("a!!!b") == "a-b"
 
+    def test_collapses_hyphens_around_replaced_characters(self):
+        assert sanitize_name("a-@-b") == "a-b"
+        assert sanitize_name("a---b") == "a-b"
+
     def test_strips_leading_and_trailing_hyphens(self):
         assert sanitize_name("@project@") == "project"
         assert sanitize_name("!!name!!") == "name"
@@ -338,6 +478,37 @@ class TestSanitizeName:
             assert pattern.match(result), f"sanitize_name({name!r}) = {result!r} doesn't match AGENT_ID_PATTERN"
 
 
+class TestTruncate:
+    """Tests for truncate()."""
+
+    def test_short_text_unchanged(self):
+        assert truncate("hello", 5) == "hello"
+
+    def test_long_text_cut_with_ellipsis(self):
+        assert truncate("hello world", 5) == "hello..."
+
+
+class TestIsUrgent:
+    """Tests for is_urgent()."""
+
+    def test_uses_coordinator_flag(self):
+        assert is_urgent({"message": "hello", "urgent": True}) is True
+        assert is_urgent({"message": "URGENT", "urgent": False}) is False
+
+    @pytest.mark.parametrize("message", [
+        "URGENT: need help",
+        "please interrupt what you're doing",
+        "Build was cancelled",
+        "reply asap",
+        "Critical failure in prod",
+    ])
+    def test_falls_back_to_keyword_scan_without_flag(self, message):
+        assert is_urgent({"message": message}) is True
+
+    def test_fallback_no_match_for_plain_message(self):
+        assert is_urgent({"message": "Can you review my PR when you get a chance?"}) is False
+
+
 class TestHooksJsonValidation:
     """Validate that hooks.json is structurally correct and references existing files."""
 
@@ -427,3 +598,29 @@ class TestHooksJsonValidation:
                             assert os.path.exists(full_path), (
                                 f"{event_name} references non-existent file: {relative_path}"
                             )
+
+    def test_no_site_hooks_run_without_site(self):
+        """Hooks launched with `python3 -S` must only need the stdlib and c3po_common."""
+        import subprocess
+        data = self._load_hooks_json()
+        commands = [
+            hook["command"]
+            for entries in data["hooks"].values()
+            for entry in entries
+            for hook in entry["hooks"]
+            if hook["type"] == "command" and hook["command"].startswith("python3 -S ")
+        ]
+        assert commands, "expected at least one hook to run without site"
+        for command in commands:
+            relative_path = command.split("${CLAUDE_PLUGIN_ROOT}/")[1].rstrip('"')
+            result = subprocess.run(
+                [sys.executable, "-S", os.path.join(self.PLUGIN_ROOT, relative_path)],
+                input="{}",
+                capture_output=True,
+                text=True,
+                timeout=10,
+            )
+            assert "ImportError" not in result.stderr and "ModuleNotFoundError" not in result.stderr, (
+                f"{relative_path} failed under -S: {result.stderr}"
+            )
+            assert result.returncode == 0, f"{relative_path} exited {result.returncode}: {result.stderr}"
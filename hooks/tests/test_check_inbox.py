@@ -21,8 +21,10 @@ class MockCoordinatorHandler(BaseHTTPRequestHandler):
 
     # Class-level response configuration
     pending_response = {"count": 0, "messages": []}
+    pending_status = 200
     health_response = {"status": "ok", "agents_online": 0}
     response_delay = 0
+    requested_paths: list = []
 
     def log_message(self, format, *args):
         """Suppress request logging."""
@@ -35,12 +37,14 @@ class MockCoordinatorHandler(BaseHTTPRequestHandler):
         if self.response_delay:
             time.sleep(self.response_delay)
 
-        if self.path == "/agent/api/pending":
-            self.send_response(200)
+        self.requested_paths.append(self.path)
+        path = self.path.split("?", 1)[0]
+        if path == "/agent/api/pending":
+            self.send_response(self.pending_status)
             self.send_header("Content-Type", "application/json")
             self.end_headers()
             self.wfile.write(json.dumps(self.pending_response).encode())
-        elif self.path == "/api/health":
+        elif path == "/api/health":
             self.send_response(200)
             self.send_header("Content-Type", "application/json")
             self.end_headers()
@@ -50,12 +54,15 @@ class MockCoordinatorHandler(BaseHTTPRequestHandler):
             self.end_headers()
 
     def do_POST(self):
-        """Handle POST requests (heartbeat registration)."""
+        """Handle POST requests (register fallback heartbeat)."""
+        self.requested_paths.append(self.path)
         if self.path == "/agent/api/register":
+            body = json.dumps({"id": "test-machine/test-project"}).encode()
             self.send_response(200)
             self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
             self.end_headers()
-            self.wfile.write(b'{"id": "test-machine/test-project", "status": "online"}')
+            self.wfile.write(body)
         else:
             self.send_response(404)
             self.end_headers()
@@ -65,7 +72,9 @@ class MockCoordinatorHandler(BaseHTTPRequestHandler):
 def mock_coordinator():
     """Start a mock coordinator server."""
     MockCoordinatorHandler.pending_response = {"count": 0, "messages": []}
+    MockCoordinatorHandler.pending_status = 200
     MockCoordinatorHandler.response_delay = 0
+    MockCoordinatorHandler.requested_paths = []
 
     server = HTTPServer(("127.0.0.1", 0), MockCoordinatorHandler)
     port = server.server_address[1]
@@ -134,6 +143,57 @@ class TestCheckInboxHook:
         # No JSON output means allow stop
         assert stdout.strip() == "" or not stdout.strip().startswith("{")
 
+    def test_pending_check_doubles_as_heartbeat(self, mock_coordinator, agent_id_file):
+        """Hook should refresh last_seen via the pending request, not a separate call."""
+        MockCoordinatorHandler.pending_response = {"heartbeat": True, "count": 0, "messages": []}
+        exit_code, _, _ = run_hook(
+            {"stop_hook_active": False},
+            env={
+                "C3PO_COORDINATOR_URL": mock_coordinator,
+                "TMPDIR": agent_id_file,
+            },
+        )
+
+        assert exit_code == 0
+        assert MockCoordinatorHandler.requested_paths == ["/agent/api/pending?heartbeat=1"]
+
+    def test_falls_back_to_register_when_heartbeat_not_applied(self, mock_coordinator, agent_id_file):
+        """Coordinators without heartbeat=1 support get a separate register call."""
+        # Older coordinators ignore the parameter and omit "heartbeat"
+        MockCoordinatorHandler.pending_response = {"count": 0, "messages": []}
+        exit_code, _, _ = run_hook(
+            {"stop_hook_active": False},
+            env={
+                "C3PO_COORDINATOR_URL": mock_coordinator,
+                "TMPDIR": agent_id_file,
+            },
+        )
+
+        assert exit_code == 0
+        assert MockCoordinatorHandler.requested_paths == [
+            "/agent/api/pending?heartbeat=1",
+            "/agent/api/register",
+        ]
+
+    def test_falls_back_to_register_when_pending_check_fails(self, mock_coordinator, agent_id_file):
+        """A failed pending check should not also cost the agent its heartbeat."""
+        MockCoordinatorHandler.pending_status = 500
+        MockCoordinatorHandler.pending_response = {"error": "redis down"}
+        exit_code, stdout, _ = run_hook(
+            {"stop_hook_active": False},
+            env={
+                "C3PO_COORDINATOR_URL": mock_coordinator,
+                "TMPDIR": agent_id_file,
+            },
+        )
+
+        assert exit_code == 0
+        assert stdout.strip() == ""
+        assert MockCoordinatorHandler.requested_paths == [
+            "/agent/api/pending?heartbeat=1",
+            "/agent/api/register",
+        ]
+
     def test_blocks_stop_when_pending_messages_exist(self, mock_coordinator, agent_id_file):
         """Hook should block stop and provide reason when messages are pending."""
         MockCoordinatorHandler.pending_response = {
@@ -1,5 +1,6 @@
 """Tests for the ensure_agent_id PreToolUse hook."""
 
+import io
 import json
 import subprocess
 import sys
@@ -8,30 +9,41 @@ import tempfile
 
 import pytest
 
+# Add hooks directory to path so we can import the hook module
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import ensure_agent_id
+
 
 HOOK_SCRIPT = os.path.join(os.path.dirname(__file__), "..", "ensure_agent_id.py")
 
 TEST_SESSION_ID = "test-session-uuid-ensure"
 
 
-def run_hook(stdin_data: dict, env: dict = None) -> tuple[int, str, str]:
-    """Run the hook script and return (exit_code, stdout, stderr)."""
-    full_env = os.environ.copy()
-    if env:
-        full_env.update(env)
+@pytest.fixture
+def run_hook(monkeypatch, capsys):
+    """Run the hook's main() in-process and return (exit_code, stdout, stderr).
 
-    if "session_id" not in stdin_data:
-        stdin_data["session_id"] = TEST_SESSION_ID
+    Avoids an interpreter start per call, and drops the agent ID wait so
+    tests expecting a missing file don't sit out AGENT_ID_WAIT_TIMEOUT.
+    The tests that invoke HOOK_SCRIPT directly cover the real CLI path.
+    """
+    monkeypatch.setattr(ensure_agent_id, "AGENT_ID_WAIT_TIMEOUT", 0)
+
+    def run(stdin_data: dict) -> tuple[int, str, str]:
+        if "session_id" not in stdin_data:
+            stdin_data["session_id"] = TEST_SESSION_ID
+        stdin = io.TextIOWrapper(io.BytesIO(json.dumps(stdin_data).encode()))
+        monkeypatch.setattr(sys, "stdin", stdin)
+        try:
+            ensure_agent_id.main()
+            exit_code = 0
+        except SystemExit as e:
+            exit_code = e.code or 0
+        stdout, stderr = capsys.readouterr()
+        return exit_code, stdout, stderr
 
-    result = subprocess.run(
-        [sys.executable, HOOK_SCRIPT],
-        input=json.dumps(stdin_data),
-        capture_output=True,
-        text=True,
-        env=full_env,
-        timeout=10,
-    )
-    return result.returncode, result.stdout, result.stderr
+    return run
 
 
 class TestEnsureAgentIdHook:
@@ -69,7 +81,7 @@ class TestEnsureAgentIdHook:
         assert "C3PO:" in result.stderr
         assert "session_id" in result.stderr
 
-    def test_missing_agent_id_file_denies(self):
+    def test_missing_agent_id_file_denies(self, run_hook):
         """Hook should block with explanation when agent_id file doesn't exist."""
         exit_code, stdout, stderr = run_hook({
             "tool_name": "mcp__c3po__set_description",
@@ -81,7 +93,7 @@ class TestEnsureAgentIdHook:
         assert "C3PO:" in stderr
         assert "SessionStart hook" in stderr
 
-    def test_skips_non_c3po_tools(self):
+    def test_skips_non_c3po_tools(self, run_hook):
         """Hook should exit silently for non-c3po tools."""
         exit_code, stdout, stderr = run_hook({
             "tool_name": "some_other_tool",
@@ -91,7 +103,7 @@ class TestEnsureAgentIdHook:
         assert exit_code == 0
         assert stdout.strip() == ""
 
-    def test_skips_c3po_tools_not_needing_agent_id(self):
+    def test_skips_c3po_tools_not_needing_agent_id(self, run_hook):
         """Hook should exit silently for c3po tools that don't need agent_id."""
         exit_code, stdout, stderr = run_hook({
             "tool_name": "mcp__c3po__ping",
@@ -101,7 +113,20 @@ class TestEnsureAgentIdHook:
         assert exit_code == 0
         assert stdout.strip() == ""
 
-    def test_allows_when_agent_id_already_set(self):
+    def test_malformed_stdin_denies_even_for_skippable_tool(self):
+        """Malformed JSON must take the parse-error path whatever tool it names."""
+        result = subprocess.run(
+            [sys.executable, HOOK_SCRIPT],
+            input='{"tool_name": "mcp__c3po__ping", "tool_input": {',
+            capture_output=True,
+            text=True,
+            timeout=10,
+        )
+
+        assert result.returncode == 2
+        assert "parse failed" in result.stderr
+
+    def test_allows_when_agent_id_already_set(self, run_hook):
         """Hook should exit silently when agent_id is already in tool_input."""
         exit_code, stdout, stderr = run_hook({
             "tool_name": "mcp__c3po__set_description",
@@ -111,7 +136,7 @@ class TestEnsureAgentIdHook:
         assert exit_code == 0
         assert stdout.strip() == ""
 
-    def test_injects_agent_id_when_available(self):
+    def test_injects_agent_id_when_available(self, run_hook):
         """Hook should inject agent_id when file exists."""
         # Create a temporary agent_id file
         with tempfile.NamedTemporaryFile(
@@ -140,7 +165,7 @@ class TestEnsureAgentIdHook:
         finally:
             os.unlink(temp_file)
 
-    def test_oauth_tools_are_rejected(self):
+    def test_oauth_tools_are_rejected(self, run_hook):
         """Hook should block claude.ai OAuth MCP tools with directions to use direct connection."""
         oauth_tools = [
             "mcp__claude_ai_c3po__send_message",
@@ -164,7 +189,7 @@ class TestEnsureAgentIdHook:
             assert "/c3po setup" in stderr
             assert "Settings" in stderr
 
-    def test_all_tools_needing_agent_id(self):
+    def test_all_tools_needing_agent_id(self, run_hook):
         """Hook should block all tools in TOOLS_NEEDING_AGENT_ID when no agent_id file."""
         tools_json_path = os.path.join(
             os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
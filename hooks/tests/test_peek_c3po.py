@@ -5,6 +5,7 @@ import subprocess
 import sys
 from http.server import HTTPServer, BaseHTTPRequestHandler
 import threading
+import time
 import os
 
 import pytest
@@ -274,6 +275,53 @@ class TestPeekAsyncHook:
         assert exit_code == 0
         assert stdout.strip() == ""
 
+    def test_rate_limits_messages_without_id(self, mock_coordinator, agent_id_file):
+        """A message with no id should still write the state file and be rate-limited."""
+        MockCoordinatorHandler.pending_response = {
+            "count": 2,
+            "messages": [
+                {"from_agent": "sender", "message": "No id here"},
+                {"id": "sender::test::msg1", "from_agent": "sender", "message": "Hello"},
+            ],
+        }
+        env = {
+            "C3PO_COORDINATOR_URL": mock_coordinator,
+            "TMPDIR": agent_id_file,
+        }
+
+        exit_code, stdout, _ = run_hook({"tool_name": "Read"}, env=env)
+        assert exit_code == 0
+        assert "additionalContext" in stdout
+
+        exit_code, stdout, _ = run_hook({"tool_name": "Read"}, env=env)
+        assert exit_code == 0
+        assert stdout.strip() == ""
+
+    def test_reinjects_same_messages_after_rate_limit_window(self, mock_coordinator, agent_id_file):
+        """Hook should reinject the same messages once the state file is older than the window."""
+        MockCoordinatorHandler.pending_response = {
+            "count": 1,
+            "messages": [
+                {"id": "sender::test::msg1", "from_agent": "sender", "message": "Hello"},
+            ],
+        }
+        env = {
+            "C3PO_COORDINATOR_URL": mock_coordinator,
+            "TMPDIR": agent_id_file,
+        }
+
+        exit_code, stdout, _ = run_hook({"tool_name": "Read"}, env=env)
+        assert "additionalContext" in stdout
+
+        # Age the rate-limit state past the 60s window
+        state_file = os.path.join(agent_id_file, f"c3po-peek-{TEST_SESSION_ID}.state")
+        old = time.time() - 120
+        os.utime(state_file, (old, old))
+
+        exit_code, stdout, _ = run_hook({"tool_name": "Read"}, env=env)
+        assert exit_code == 0
+        assert "additionalContext" in stdout
+
     def test_injects_for_new_messages_despite_rate_limit(self, mock_coordinator, agent_id_file):
         """Hook should inject when new message IDs appear, even within rate limit window."""
         env = {
@@ -135,6 +135,21 @@ class TestRegisterAgentHook:
         assert "Your agent ID: test-agent" in stdout
         assert "3 agent(s) currently online" in stdout
 
+    def test_uses_agents_online_from_register_response(self, mock_coordinator):
+        """Hook should take the online count from the register response when present."""
+        MockCoordinatorHandler.register_response = {"id": "test-agent", "agents_online": 5}
+        MockCoordinatorHandler.health_response = {"status": "ok", "agents_online": 3}
+
+        exit_code, stdout, stderr = run_hook(
+            env={
+                "C3PO_COORDINATOR_URL": mock_coordinator,
+                "C3PO_MACHINE_NAME": "test-agent",
+            },
+        )
+
+        assert exit_code == 0
+        assert "5 agent(s) currently online" in stdout
+
     def test_outputs_local_mode_when_coordinator_unavailable(self):
         """Hook should indicate local mode when coordinator is not reachable."""
         exit_code, stdout, stderr = run_hook(
@@ -29,8 +29,8 @@ def _log(msg: str) -> None:
 
 def main() -> None:
     try:
-        stdin_data = json.load(sys.stdin)
-    except (json.JSONDecodeError, EOFError):
+        stdin_data = json.loads(sys.stdin.buffer.read())
+    except (json.JSONDecodeError, UnicodeDecodeError):
         sys.exit(0)
 
     tool_name = stdin_data.get("tool_name", "")
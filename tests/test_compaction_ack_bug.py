@@ -68,7 +68,6 @@ def _parse_tool_result(result):
     return str(result.content)
 
 
-@pytest.mark.asyncio
 async def test_compaction_ack_loop_with_delay():
     """
     Test that detects the ack loop bug with delayed acknowledgment.
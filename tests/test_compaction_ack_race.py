@@ -64,7 +64,6 @@ def _parse_tool_result(result):
     return str(result.content)
 
 
-@pytest.mark.asyncio
 async def test_compaction_clears_acked_set():
     """Test that compaction doesn't leave agents in ack loop.
 
@@ -151,7 +150,6 @@ async def test_compaction_clears_acked_set():
         print("\n  ✓ Test passed - compaction and ack work correctly")
 
 
-@pytest.mark.asyncio
 async def test_compaction_ack_loop_detection():
     """Test that detects the ack loop bug.
 
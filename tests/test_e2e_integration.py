@@ -87,21 +87,18 @@ def _parse_tool_result(result) -> dict | list | str:
 class TestE2EIntegration:
     """End-to-end integration tests."""
 
-    @pytest.mark.asyncio
     async def test_ping_tool(self):
         """Test the ping tool returns expected response."""
         async with mcp_client_session("e2e/ping") as session:
             result = await session.call_tool("ping", {})
             assert "pong" in str(result)
 
-    @pytest.mark.asyncio
     async def test_agent_registration_via_list(self):
         """Test that connecting registers the agent."""
         async with mcp_client_session("e2e/list") as session:
             result = await session.call_tool("list_agents", {})
             assert result is not None
 
-    @pytest.mark.asyncio
     async def test_send_and_receive_message(self):
         """Test sending a message from one agent to another."""
         # Register agent-b first
@@ -117,7 +114,6 @@ class TestE2EIntegration:
             })
             assert send_result is not None
 
-    @pytest.mark.asyncio
     async def test_full_message_reply_cycle(self):
         """Test complete message/reply cycle between two agents."""
         # Step 1: Register both agents
@@ -140,7 +136,6 @@ class TestE2EIntegration:
             pending = await receiver.call_tool("get_messages", {})
             assert pending is not None
 
-    @pytest.mark.asyncio
     async def test_wait_for_message_timeout(self):
         """Test that wait_for_message times out correctly."""
         async with mcp_client_session("e2e/timeout") as session:
@@ -154,7 +149,6 @@ class TestE2EIntegration:
 class TestRESTEndpoints:
     """Test REST API endpoints directly (no MCP session needed)."""
 
-    @pytest.mark.asyncio
     async def test_health_endpoint(self):
         """Test /api/health endpoint."""
         import httpx
@@ -166,7 +160,6 @@ class TestRESTEndpoints:
             assert data["status"] == "ok"
             assert "agents_online" in data
 
-    @pytest.mark.asyncio
     async def test_pending_endpoint_without_header(self):
         """Test /agent/api/pending without X-Machine-Name header returns error."""
         import httpx
@@ -177,7 +170,6 @@ class TestRESTEndpoints:
             data = response.json()
             assert "error" in data
 
-    @pytest.mark.asyncio
     async def test_pending_endpoint_with_header(self):
         """Test /agent/api/pending with X-Machine-Name header."""
         import httpx
@@ -204,7 +196,6 @@ class TestLatency:
         C3PO_TEST_LIVE=1 pytest tests/test_e2e_integration.py -v -k latency
     """
 
-    @pytest.mark.asyncio
     async def test_latency_ping_round_trip(self):
         """Ping round-trip should be well under 500ms."""
         async with mcp_client_session("latency/ping") as session:
@@ -220,7 +211,6 @@ class TestLatency:
                   f"min={min(latencies):.1f}ms  max={max(latencies):.1f}ms")
             assert avg < 500, f"Ping avg {avg:.1f}ms exceeds 500ms"
 
-    @pytest.mark.asyncio
     async def test_latency_send_message(self):
         """send_message round-trip through MCP."""
         async with mcp_client_session("latency/sender") as session:
@@ -243,7 +233,6 @@ class TestLatency:
                   f"min={min(latencies):.1f}ms  max={max(latencies):.1f}ms")
             assert avg < 1000, f"send_message avg {avg:.1f}ms exceeds 1s"
 
-    @pytest.mark.asyncio
     async def test_latency_send_then_receive(self):
         """Full send → wait_for_message → ack cycle between two sessions.
 
@@ -296,7 +285,6 @@ class TestLatency:
               f"min={min(latencies):.1f}ms  max={max(latencies):.1f}ms")
         assert avg < 2000, f"send→receive avg {avg:.1f}ms exceeds 2s"
 
-    @pytest.mark.asyncio
     async def test_latency_get_messages_under_load(self):
         """get_messages latency with a full inbox."""
         async with mcp_client_session("latency/loaded") as session:
@@ -328,7 +316,6 @@ class TestLatency:
                   f"min={min(latencies):.1f}ms  max={max(latencies):.1f}ms")
             assert avg < 1000, f"get_messages avg {avg:.1f}ms exceeds 1s"
 
-    @pytest.mark.asyncio
     async def test_latency_concurrent_senders(self):
         """Multiple concurrent senders to the same target."""
         async with mcp_client_session("latency/target") as target_session:
@@ -391,7 +378,6 @@ class TestAckBehavior:
         C3PO_TEST_LIVE=1 pytest tests/test_e2e_integration.py::TestAckBehavior -v
     """
 
-    @pytest.mark.asyncio
     async def test_ack_removes_message_from_queue(self):
         """Verify that acked messages don't appear in subsequent get_messages calls."""
         async with mcp_client_session("ack/sender") as sender:
@@ -432,7 +418,6 @@ class TestAckBehavior:
                     msg_count = 0
                 assert msg_count == 0, "Message should be removed after ack"
 
-    @pytest.mark.asyncio
     async def test_partial_ack_leaves_other_messages(self):
         """Verify that acking some messages doesn't remove unacked ones."""
         async with mcp_client_session("ack/sender2") as sender:
@@ -479,7 +464,6 @@ class TestAckBehavior:
                 elif isinstance(parsed, dict):
                     assert parsed["messages"][0]["message"] == "Message 2"
 
-    @pytest.mark.asyncio
     async def test_compaction_removes_acked_messages(self):
         """Verify compaction removes all acked messages when threshold is exceeded."""
         async with mcp_client_session("ack/sender3") as sender:
@@ -561,7 +545,6 @@ class TestWatcherPattern:
             headers["Authorization"] = f"Bearer {api_token}"
         return headers, coordinator_url
 
-    @pytest.mark.asyncio
     async def test_keep_registered_marks_agent_offline(self):
         """unregister?keep=true should keep agent in registry but mark it offline."""
         import httpx
@@ -593,7 +576,6 @@ class TestWatcherPattern:
         # Cleanup
         httpx.post(f"{base_url}/agent/api/unregister", headers=headers, timeout=5)
 
-    @pytest.mark.asyncio
     async def test_api_wait_returns_on_message(self):
         """GET /api/wait should unblock when a message is sent to the agent."""
         import httpx
@@ -652,7 +634,6 @@ class TestWatcherPattern:
         # Cleanup
         httpx.post(f"{base_url}/agent/api/unregister", headers=headers, timeout=5)
 
-    @pytest.mark.asyncio
     async def test_watcher_full_cycle(self):
         """Full watcher cycle: register → keep→offline → send → wait → unregister."""
         import httpx